@@ -5,6 +5,12 @@ from typing import List
 from ..database import get_db
 from ..models import Camera
 from ..schemas import CameraCreate, CameraUpdate, CameraOut, MessageResponse
+from ..services.stream_pool import stream_pool
+from ..services.scheduler_service import scheduler_service
+from ..inference.annotator import annotator
+from ..inference.zone_index import zone_index
+from ..inference.motion_gate import motion_gate
+from ..inference.floor_plan import floor_dedup
 
 router = APIRouter(prefix="/cameras", tags=["cameras"])
 
@@ -18,6 +24,7 @@ def create_camera(camera: CameraCreate, db: Session = Depends(get_db)):
     db.add(db_camera)
     db.commit()
     db.refresh(db_camera)
+    scheduler_service.reload_schedules()
     return db_camera
 
 @router.get("/{camera_id}", response_model=CameraOut)
@@ -33,12 +40,22 @@ def update_camera(camera_id: int, camera: CameraUpdate, db: Session = Depends(ge
     if not db_camera:
         raise HTTPException(status_code=404, detail="Camera not found")
     
+    old_url = db_camera.rtsp_url
     update_data = camera.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_camera, key, value)
     
     db.commit()
     db.refresh(db_camera)
+
+    # Drop the pooled stream if it points at an old source or the camera was disabled
+    if db_camera.rtsp_url != old_url or not db_camera.is_enabled:
+        stream_pool.release(old_url)
+        motion_gate.forget(camera_id)
+    if "homography" in update_data:
+        floor_dedup.forget(camera_id)
+    if "is_enabled" in update_data or "schedule_id" in update_data or "rtsp_url" in update_data:
+        scheduler_service.reload_schedules()
     return db_camera
 
 @router.delete("/{camera_id}", response_model=MessageResponse)
@@ -47,8 +64,15 @@ def delete_camera(camera_id: int, db: Session = Depends(get_db)):
     if not db_camera:
         raise HTTPException(status_code=404, detail="Camera not found")
     
+    rtsp_url = db_camera.rtsp_url
     db.delete(db_camera)
     db.commit()
+    stream_pool.release(rtsp_url)
+    annotator.forget(camera_id)
+    zone_index.invalidate(camera_id)
+    motion_gate.forget(camera_id)
+    floor_dedup.forget(camera_id)
+    scheduler_service.reload_schedules()
     return {"message": "Camera deleted successfully"}
 
 from fastapi.responses import StreamingResponse
@@ -70,3 +94,17 @@ def get_camera_preview(camera_id: int, db: Session = Depends(get_db)):
     # Encode to JPEG
     _, img_encoded = cv2.imencode('.jpg', frame)
     return Response(content=img_encoded.tobytes(), media_type="image/jpeg")
+
+@router.get("/{camera_id}/annotated")
+def get_camera_annotated(camera_id: int, db: Session = Depends(get_db)):
+    """
+    Returns the latest detection overlay for this camera (boxes, centers, counted/ignored labels).
+    """
+    db_camera = db.query(Camera).filter(Camera.id == camera_id).first()
+    if not db_camera:
+        raise HTTPException(status_code=404, detail="Camera not found")
+    
+    jpeg = annotator.get_jpeg(camera_id)
+    if jpeg is None:
+        return Response(status_code=404, content="No annotated frame available")
+    return Response(content=jpeg, media_type="image/jpeg")
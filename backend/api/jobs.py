@@ -0,0 +1,19 @@
+from fastapi import APIRouter, HTTPException
+
+from ..services.job_service import job_service
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+@router.get("/")
+def get_jobs():
+    """
+    Recent capture jobs, newest first.
+    """
+    return [job.to_dict() for job in reversed(list(job_service.jobs.values()))]
+
+@router.get("/{job_id}")
+def get_job(job_id: str):
+    job = job_service.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
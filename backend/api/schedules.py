@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List
+
+from ..database import get_db
+from ..models import CaptureSchedule, Camera, CaptureSession
+from ..schemas import ScheduleCreate, ScheduleUpdate, ScheduleOut, MessageResponse
+from ..services.scheduler_service import scheduler_service
+
+router = APIRouter(prefix="/schedules", tags=["schedules"])
+
+@router.get("/", response_model=List[ScheduleOut])
+def get_schedules(db: Session = Depends(get_db)):
+    return db.query(CaptureSchedule).all()
+
+@router.post("/", response_model=ScheduleOut)
+def create_schedule(schedule: ScheduleCreate, db: Session = Depends(get_db)):
+    db_schedule = CaptureSchedule(**schedule.model_dump())
+    db.add(db_schedule)
+    db.commit()
+    db.refresh(db_schedule)
+    scheduler_service.reload_schedules()
+    return db_schedule
+
+@router.put("/{schedule_id}", response_model=ScheduleOut)
+def update_schedule(schedule_id: int, schedule: ScheduleUpdate, db: Session = Depends(get_db)):
+    db_schedule = db.query(CaptureSchedule).filter(CaptureSchedule.id == schedule_id).first()
+    if not db_schedule:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    
+    update_data = schedule.model_dump(exclude_unset=True)
+    for key, value in update_data.items():
+        setattr(db_schedule, key, value)
+    
+    db.commit()
+    db.refresh(db_schedule)
+    scheduler_service.reload_schedules()
+    return db_schedule
+
+@router.delete("/{schedule_id}", response_model=MessageResponse)
+def delete_schedule(schedule_id: int, db: Session = Depends(get_db)):
+    db_schedule = db.query(CaptureSchedule).filter(CaptureSchedule.id == schedule_id).first()
+    if not db_schedule:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    
+    # Cameras fall back to the default schedule; an unfinished session of this schedule is closed out
+    db.query(Camera).filter(Camera.schedule_id == schedule_id).update({Camera.schedule_id: None})
+    active = db.query(CaptureSession).filter(CaptureSession.schedule_id == schedule_id, CaptureSession.is_completed == False).first()
+    if active:
+        scheduler_service.finalize_session(db, active, commit=False)
+    db.delete(db_schedule)
+    db.commit()
+    scheduler_service.reload_schedules()
+    return {"message": "Schedule deleted successfully"}
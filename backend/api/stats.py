@@ -1,57 +1,108 @@
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import Response
-from sqlalchemy.orm import Session
-from typing import List
-import csv
-import io
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import or_
+from sqlalchemy.orm import Session, joinedload
+from typing import List, Optional
+from datetime import datetime
+import asyncio
+import hashlib
+import json
 
-from ..database import get_db
-from ..models import CaptureSession, HallSessionStat, CameraSessionStat, Camera, CaptureResult
-from ..schemas import SessionStatOut
+from ..database import get_db, SessionLocal
+from ..models import CaptureSession
+from ..schemas import SessionStatOut, RollupOut
+from ..services.stats_service import latest_session_total, live_total, schedule_label
+from ..services.event_bus import event_bus, format_sse
+from ..services.export_service import stream_csv, stream_parquet
+from ..services.rollup_service import query_rollups
 
 router = APIRouter(prefix="/stats", tags=["stats"])
 
+STREAM_KEEPALIVE_SECONDS = 15
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 500
+
 @router.get("/live")
 def get_live_stats(db: Session = Depends(get_db)):
     """
-    Returns the most recent captured count for the active session.
+    Returns the most recent captured count across the active session(s).
     """
-    # Find active session
-    session = db.query(CaptureSession).filter(CaptureSession.is_completed == False).first()
-    if not session:
-        return {"live_count": 0}
-        
-    # Get latest result for this session
     # We want the SUM of latest counts from all active cameras
-    cams = db.query(Camera).filter(Camera.is_enabled == True).all()
-    total_live = 0
-    
-    last_updated = None
-    
-    for cam in cams:
-        last = db.query(CaptureResult).filter(
-            CaptureResult.session_id == session.id,
-            CaptureResult.camera_id == cam.id
-        ).order_by(CaptureResult.captured_at.desc()).first()
-        
-        if last:
-            total_live += last.people_count
-            if not last_updated or last.captured_at > last_updated:
-                last_updated = last.captured_at
+    total_live, last_updated = live_total(db)
+    if last_updated is None:
+        return {"live_count": 0}
             
     return {
         "live_count": total_live,
         "last_updated": last_updated
     }
 
+def _stream_snapshot() -> dict:
+    from ..services.scheduler_service import scheduler_service
+    db = SessionLocal()
+    try:
+        live = get_live_stats(db)
+    finally:
+        db.close()
+    return {**live, "is_paused": scheduler_service.is_paused}
 
+@router.get("/stream")
+async def stream_stats(request: Request):
+    """
+    Server-sent events. Sends a "snapshot" with the current live stats, then pushes
+    "capture", "session" and "status" events as the scheduler commits them.
+    """
+    # Subscribe first so nothing committed while the snapshot is read is missed
+    queue = event_bus.subscribe()
+    try:
+        snapshot = await run_in_threadpool(_stream_snapshot)
+    except Exception:
+        event_bus.unsubscribe(queue)
+        raise
+
+    async def events():
+        try:
+            yield format_sse("snapshot", snapshot)
+            while not await request.is_disconnected():
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+        finally:
+            event_bus.unsubscribe(queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 @router.get("/history", response_model=List[SessionStatOut])
-def get_history(db: Session = Depends(get_db)):
+def get_history(
+    request: Request,
+    response: Response,
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    cursor: Optional[int] = Query(None, description="Return sessions older than this session_id"),
+    since: Optional[datetime] = Query(None, description="Only sessions started, finished or still active after this time"),
+    db: Session = Depends(get_db)
+):
     """
-    Returns completed sessions with their total hall counts.
+    Returns sessions (newest first) with their total hall counts, one page at a time.
+    The next page's cursor is sent in the X-Next-Cursor header; an If-None-Match
+    matching the page's ETag gets a 304.
     """
-    sessions = db.query(CaptureSession).order_by(CaptureSession.start_time.desc()).all()
+    query = db.query(CaptureSession).options(joinedload(CaptureSession.hall_stat), joinedload(CaptureSession.schedule))
+    if cursor is not None:
+        query = query.filter(CaptureSession.id < cursor)
+    if since is not None:
+        query = query.filter(or_(
+            CaptureSession.start_time >= since,
+            CaptureSession.end_time >= since,
+            CaptureSession.is_completed == False
+        ))
+    # Session ids grow with start_time, so the id is a stable cursor
+    sessions = query.order_by(CaptureSession.id.desc()).limit(limit + 1).all()
+    has_more = len(sessions) > limit
+    sessions = sessions[:limit]
     
     result = []
     for s in sessions:
@@ -59,54 +110,67 @@ def get_history(db: Session = Depends(get_db)):
             total = s.hall_stat.total_count if s.hall_stat else 0
         else:
             # For active session, calculate rough total from latest captures
-            # (Similar logic to live stats, but maybe just use what we have)
-            cams = db.query(Camera).filter(Camera.is_enabled == True).all()
-            total = 0
-            for cam in cams:
-                last = db.query(CaptureResult).filter(
-                    CaptureResult.session_id == s.id,
-                    CaptureResult.camera_id == cam.id
-                ).order_by(CaptureResult.captured_at.desc()).first()
-                if last:
-                    total += last.people_count
+            total, _ = latest_session_total(db, s.id)
         
         result.append({
             "session_id": s.id,
             "start_time": s.start_time,
             "end_time": s.end_time,
+            "schedule_id": s.schedule_id,
+            "schedule_name": schedule_label(s),
             "total_hall_count": total
         })
+    
+    body = jsonable_encoder(result)
+    etag = '"' + hashlib.sha1(json.dumps(body, sort_keys=True).encode()).hexdigest() + '"'
+    headers = {"ETag": etag}
+    if has_more:
+        headers["X-Next-Cursor"] = str(sessions[-1].id)
+    
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    response.headers.update(headers)
     return result
 
+@router.get("/rollups", response_model=List[RollupOut])
+def get_rollups(
+    bucket: str = Query("hour", pattern="^(hour|day)$"),
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    camera_id: Optional[int] = Query(None, description="Omit for hall-wide totals"),
+    db: Session = Depends(get_db)
+):
+    """
+    Hourly or daily occupancy (avg/min/max/percentiles) from the precomputed rollup table.
+    """
+    return query_rollups(db, bucket, start, end, camera_id)
+
 @router.get("/export")
-def export_csv(db: Session = Depends(get_db)):
+def export_csv(
+    export_format: str = Query("csv", alias="format", pattern="^(csv|parquet)$"),
+    granularity: str = Query("session", pattern="^(session|capture)$"),
+    start: Optional[datetime] = Query(None, description="Inclusive lower bound (session start / capture time)"),
+    end: Optional[datetime] = Query(None, description="Exclusive upper bound"),
+):
     """
-    Exports all completed session data to CSV.
-    Format: Session ID, Start Time, End Time, Camera Name, Average Count
+    Streams completed session data (or raw captures with granularity=capture) as CSV or Parquet.
+    Session format: Session ID, Start Time, End Time, Total Hall Count, Camera Name, Camera Average
     """
-    sessions = db.query(CaptureSession).filter(CaptureSession.is_completed == True).order_by(CaptureSession.start_time.desc()).all()
-    
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Header
-    writer.writerow(["Session ID", "Start Time", "End Time", "Total Hall Count", "Camera Name", "Camera Average"])
-    
-    for s in sessions:
-        start_str = s.start_time.strftime("%Y-%m-%d %H:%M:%S")
-        end_str = s.end_time.strftime("%Y-%m-%d %H:%M:%S") if s.end_time else ""
-        total = s.hall_stat.total_count if s.hall_stat else 0
-        
-        # Get per-camera stats
-        cam_stats = db.query(CameraSessionStat).filter(CameraSessionStat.session_id == s.id).all()
-        
-        if not cam_stats:
-            # Entry without camera details
-            writer.writerow([s.id, start_str, end_str, total, "N/A", "N/A"])
-        else:
-            for cs in cam_stats:
-                cam_name = cs.camera.name if cs.camera else f"Cam {cs.camera_id}"
-                writer.writerow([s.id, start_str, end_str, total, cam_name, cs.average_count])
-                
-    output.seek(0)
-    return Response(content=output.getvalue(), media_type="text/csv", headers={"Content-Disposition": "attachment; filename=stats.csv"})
+    if export_format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+        return StreamingResponse(
+            stream_parquet(granularity, start, end),
+            media_type="application/vnd.apache.parquet",
+            headers={"Content-Disposition": f"attachment; filename=stats_{granularity}.parquet"}
+        )
+
+    filename = "stats.csv" if granularity == "session" else "stats_capture.csv"
+    return StreamingResponse(
+        stream_csv(granularity, start, end),
+        media_type="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
@@ -1,5 +1,11 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from ..database import get_db
 from ..services.scheduler_service import scheduler_service
+from ..inference.motion_gate import motion_gate
+from ..services.image_store import image_store, latest_images
 
 router = APIRouter(prefix="/system", tags=["system"])
 
@@ -18,3 +24,29 @@ def pause_system():
 def resume_system():
     scheduler_service.resume()
     return {"status": "resumed", "is_paused": False}
+
+@router.get("/schedule")
+def get_schedule_metrics():
+    """
+    Per-schedule timing: next run, how late rounds start (lag), and rounds skipped to avoid overlap.
+    """
+    return scheduler_service.schedule_metrics()
+
+@router.get("/motion")
+def get_motion_metrics():
+    """
+    Per-camera motion gate stats: frames checked, inferences skipped and the skip rate.
+    """
+    return motion_gate.metrics()
+
+@router.get("/storage")
+def get_storage_stats():
+    """
+    Image store usage per day, retention settings and what pruning has removed so far.
+    """
+    return image_store.stats()
+
+@router.get("/images/latest")
+def get_latest_images(limit: int = Query(10, ge=1, le=200), camera_id: Optional[int] = None,
+                      db: Session = Depends(get_db)):
+    return latest_images(db, limit, camera_id)
@@ -5,6 +5,8 @@ from typing import List
 from ..database import get_db
 from ..models import Zone, Camera
 from ..schemas import ZoneCreate, ZoneUpdate, ZoneOut, MessageResponse
+from ..inference.zone_index import zone_index
+from ..inference.motion_gate import motion_gate
 
 router = APIRouter(prefix="/zones", tags=["zones"])
 
@@ -23,6 +25,8 @@ def create_zone(zone: ZoneCreate, db: Session = Depends(get_db)):
     db.add(db_zone)
     db.commit()
     db.refresh(db_zone)
+    zone_index.invalidate(db_zone.camera_id)
+    motion_gate.forget(db_zone.camera_id)
     return db_zone
 
 @router.put("/{zone_id}", response_model=ZoneOut)
@@ -37,6 +41,8 @@ def update_zone(zone_id: int, zone: ZoneUpdate, db: Session = Depends(get_db)):
     
     db.commit()
     db.refresh(db_zone)
+    zone_index.invalidate(db_zone.camera_id)
+    motion_gate.forget(db_zone.camera_id)
     return db_zone
 
 @router.delete("/{zone_id}", response_model=MessageResponse)
@@ -45,6 +51,9 @@ def delete_zone(zone_id: int, db: Session = Depends(get_db)):
     if not db_zone:
         raise HTTPException(status_code=404, detail="Zone not found")
     
+    camera_id = db_zone.camera_id
     db.delete(db_zone)
     db.commit()
+    zone_index.invalidate(camera_id)
+    motion_gate.forget(camera_id)
     return {"message": "Zone deleted successfully"}
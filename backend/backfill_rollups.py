@@ -0,0 +1,90 @@
+import sys
+import os
+
+# Ensure backend can be imported
+sys.path.append(os.getcwd())
+
+from datetime import timedelta
+
+from sqlalchemy import func
+
+from backend.database import SessionLocal, Base
+from backend.models import CaptureResult, CaptureSession, OccupancyRollup
+from backend.services.rollup_service import RollupAccumulator
+
+def backfill(session_factory=SessionLocal):
+    """
+    Rebuilds occupancy_rollups from every stored capture result.
+    Results of a session captured within the same minute are treated as one round.
+    Like the live series, a round's hall sample adds the latest count of every camera
+    in the newest session of each schedule, not just the cameras of that round.
+    History is read, flushed and committed one day at a time, so memory stays flat
+    however long it is.
+    """
+    print("=== ROLLUP BACKFILL START ===")
+    Base.metadata.create_all(bind=session_factory.kw["bind"])
+
+    db = session_factory()
+    try:
+        deleted = db.query(OccupancyRollup).delete()
+        db.commit()
+        print(f"Cleared {deleted} existing rollup rows.")
+
+        first, last = db.query(func.min(CaptureResult.captured_at), func.max(CaptureResult.captured_at)).one()
+        acc = RollupAccumulator()
+        # camera_id -> (session_id, latest count), schedule_id -> its newest session; carried across days
+        latest = {}
+        current_sessions = {}
+        rounds = 0
+        days = 0
+
+        def hall_total():
+            active = set(current_sessions.values())
+            return sum(count for session_id, count in latest.values() if session_id in active)
+
+        day = first.replace(hour=0, minute=0, second=0, microsecond=0) if first else None
+        while day is not None and day <= last:
+            next_day = day + timedelta(days=1)
+            rows = db.query(CaptureResult.session_id, CaptureSession.schedule_id, CaptureResult.camera_id,
+                            CaptureResult.people_count, CaptureResult.dedup_count, CaptureResult.captured_at)\
+                     .join(CaptureSession, CaptureSession.id == CaptureResult.session_id)\
+                     .filter(CaptureResult.captured_at >= day, CaptureResult.captured_at < next_day)\
+                     .order_by(CaptureResult.captured_at, CaptureResult.session_id).all()
+            day = next_day
+            if not rows:
+                continue
+
+            current_key = None
+            round_time = None
+            counts = {}
+            for session_id, schedule_id, camera_id, people_count, dedup_count, captured_at in rows:
+                key = (session_id, captured_at.replace(second=0, microsecond=0))
+                if key != current_key:
+                    if counts:
+                        acc.add_round(round_time, counts, hall_total())
+                        rounds += 1
+                    current_key, round_time, counts = key, captured_at, {}
+                counts[camera_id] = people_count
+                current_sessions[schedule_id] = session_id
+                # Hall series counts people seen by overlapping cameras once
+                latest[camera_id] = (session_id, dedup_count if dedup_count is not None else people_count)
+            if counts:
+                acc.add_round(round_time, counts, hall_total())
+                rounds += 1
+
+            acc.flush(db)
+            db.commit()
+            days += 1
+
+        print(f"Rolled up {rounds} rounds over {days} days.")
+    except Exception as e:
+        db.rollback()
+        print(f"!!! BACKFILL ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        db.close()
+        print("=== ROLLUP BACKFILL END ===")
+
+if __name__ == "__main__":
+    backfill()
@@ -0,0 +1,103 @@
+import sys
+import os
+import tempfile
+import threading
+import time
+
+# Ensure backend can be imported
+sys.path.append(os.getcwd())
+
+# Benchmark against a throwaway SQLite file unless DATABASE_URL points elsewhere
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+from datetime import datetime
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+
+from backend.database import SessionLocal, engine, Base, DATABASE_URL
+from backend.models import Camera, CaptureSession, CaptureResult
+from backend.services.rollup_service import record_round
+from backend.services.stats_service import latest_session_total, live_total
+
+NUM_CAMERAS = int(os.getenv("BENCH_CAMERAS", "32"))
+NUM_READERS = int(os.getenv("BENCH_READERS", "8"))
+DURATION_SECONDS = float(os.getenv("BENCH_SECONDS", "10"))
+
+def benchmark():
+    """
+    Measures capture-round write throughput while API-style readers poll live stats.
+    The writer issues the same statements as a real round: bulk result insert plus rollups.
+    """
+    print(f"=== DB BENCHMARK ({DATABASE_URL}) ===")
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    cameras = [Camera(name=f"Bench {i}", rtsp_url=str(i)) for i in range(NUM_CAMERAS)]
+    session = CaptureSession(start_time=datetime.now())
+    db.add_all(cameras + [session])
+    db.commit()
+    camera_ids = [c.id for c in cameras]
+    session_id = session.id
+    db.close()
+
+    stop = threading.Event()
+    stats = {"rounds": 0, "reads": 0, "read_time": 0.0, "lock_errors": 0}
+    lock = threading.Lock()
+
+    def writer():
+        db = SessionLocal()
+        while not stop.is_set():
+            try:
+                now = datetime.now()
+                # Same writes as a capture round (SchedulerService.perform_capture): one bulk
+                # INSERT of the results, then the rollups, in one transaction
+                results = [
+                    {"session_id": session_id, "camera_id": cid, "image_path": "", "people_count": cid % 7,
+                     "reused": False, "dedup_count": None, "captured_at": now}
+                    for cid in camera_ids
+                ]
+                db.execute(insert(CaptureResult), results)
+                hall_total, _ = live_total(db)
+                record_round(db, now, {r["camera_id"]: r["people_count"] for r in results}, float(hall_total))
+                db.commit()
+                stats["rounds"] += 1
+            except OperationalError:
+                db.rollback()
+                stats["lock_errors"] += 1
+        db.close()
+
+    def reader():
+        db = SessionLocal()
+        while not stop.is_set():
+            t = time.perf_counter()
+            try:
+                latest_session_total(db, session_id)
+                db.rollback()  # end the read transaction like a request would
+                with lock:
+                    stats["reads"] += 1
+                    stats["read_time"] += time.perf_counter() - t
+            except OperationalError:
+                db.rollback()
+                with lock:
+                    stats["lock_errors"] += 1
+        db.close()
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(NUM_READERS)]
+    for t in threads:
+        t.start()
+    time.sleep(DURATION_SECONDS)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    rounds = stats["rounds"]
+    print(f"Cameras: {NUM_CAMERAS}, Readers: {NUM_READERS}, Duration: {DURATION_SECONDS}s")
+    print(f"Writes: {rounds} rounds ({rounds / DURATION_SECONDS:.1f} rounds/s, {rounds * NUM_CAMERAS / DURATION_SECONDS:.0f} rows/s)")
+    if stats["reads"]:
+        print(f"Reads: {stats['reads']} ({stats['reads'] / DURATION_SECONDS:.1f}/s, avg {1000 * stats['read_time'] / stats['reads']:.2f} ms)")
+    print(f"'database is locked' errors: {stats['lock_errors']}")
+    print("=== DB BENCHMARK END ===")
+
+if __name__ == "__main__":
+    benchmark()
@@ -7,24 +7,21 @@ sys.path.append(os.getcwd())
 
 from backend.database import SessionLocal
 from backend.models import CaptureResult, CaptureSession, Camera
-from backend.services.scheduler_service import scheduler_service
 
 def diagnose():
     print("=== DIAGNOSTIC START ===")
     
-    # 1. Check Images Folder
-    img_dir = "images"
-    if os.path.exists(img_dir):
-        files = os.listdir(img_dir)
-        print(f"Image Directory '{img_dir}' exists. Contains {len(files)} files.")
-        if len(files) > 0:
-            print(f"Latest 3 files: {sorted(files)[-3:]}")
-    else:
-        print(f"!!! Image Directory '{img_dir}' DOES NOT EXIST.")
-
-    # 2. Check Database
     db = SessionLocal()
     try:
+        # 1. Check Images (latest ones come from the capture_results index, not a directory listing)
+        from backend.services.image_store import IMAGE_DIR, latest_images
+        latest = latest_images(db, limit=3)
+        if latest:
+            print(f"Image store '{IMAGE_DIR}'. Latest 3 files: {[img['image_path'] for img in latest]}")
+        else:
+            print(f"!!! Image store '{IMAGE_DIR}' has no recorded images.")
+
+        # 2. Check Database
         session = db.query(CaptureSession).filter(CaptureSession.is_completed == False).first()
         if session:
             print(f"Active Session: ID {session.id}, Started: {session.start_time}")
@@ -33,6 +30,8 @@ def diagnose():
             
         # 3. Force Capture
         print(">>> Forcing Capture Cycle...")
+        # Imported here so the DB checks above don't pay for scheduler/model setup
+        from backend.services.scheduler_service import scheduler_service
         scheduler_service.check_and_run_cycle(force=True)
         print(">>> Capture Cycle Done.")
         
@@ -0,0 +1,127 @@
+import logging
+import os
+import queue
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# off     - never keep frames for annotation
+# sampled - keep every ANNOTATION_SAMPLE_EVERY-th inference per camera
+# always  - keep every inference
+ANNOTATION_MODE = os.getenv("ANNOTATION_MODE", "sampled").lower()
+ANNOTATION_SAMPLE_EVERY = int(os.getenv("ANNOTATION_SAMPLE_EVERY", "5"))
+# Overlays are rendered at most this wide (0 keeps the full resolution)
+ANNOTATION_MAX_WIDTH = int(os.getenv("ANNOTATION_MAX_WIDTH", "960"))
+
+
+class Annotator:
+    """
+    Keeps the latest detection overlay per camera as a ready-made JPEG.
+    The inference path only hands over references (record); downscaling to max_width,
+    drawing and JPEG encoding happen on a background render thread, so neither a capture
+    round nor an HTTP request waits on them and no full-resolution frame is kept around.
+    Pending work is coalesced per camera: only the newest snapshot of each camera is rendered.
+    """
+    def __init__(self, mode: str = ANNOTATION_MODE, sample_every: int = ANNOTATION_SAMPLE_EVERY,
+                 max_width: int = ANNOTATION_MAX_WIDTH):
+        if mode not in ("off", "sampled", "always"):
+            logger.warning(f"Unknown ANNOTATION_MODE '{mode}', falling back to 'sampled'")
+            mode = "sampled"
+        self.mode = mode
+        self.sample_every = max(1, sample_every)
+        self.max_width = max_width
+        self._seen: Dict[int, int] = {}
+        self._jpegs: Dict[int, bytes] = {}
+        # camera_id -> (frame, detections) waiting for the render thread
+        self._pending: Dict[int, tuple] = {}
+        # Bumped by forget(), so a render that was under way for a removed camera is discarded
+        self._epochs: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def wants(self, camera_id: int) -> bool:
+        """
+        Decides whether the current inference for this camera should be kept.
+        """
+        if self.mode == "off":
+            return False
+        if self.mode == "always":
+            return True
+        with self._lock:
+            n = self._seen.get(camera_id, 0)
+            self._seen[camera_id] = n + 1
+        return n % self.sample_every == 0
+
+    def record(self, camera_id: int, frame, detections: list):
+        """
+        Hands a frame and its detections ((x1, y1, x2, y2), in_zone) to the render thread.
+        """
+        with self._lock:
+            queued = camera_id in self._pending
+            self._pending[camera_id] = (frame, detections)
+            # Started on first use, so inference worker processes (which never record) don't get one
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="annotator", daemon=True)
+                self._thread.start()
+        if not queued:
+            self._queue.put(camera_id)
+
+    def forget(self, camera_id: int):
+        with self._lock:
+            self._jpegs.pop(camera_id, None)
+            self._pending.pop(camera_id, None)
+            self._seen.pop(camera_id, None)
+            self._epochs[camera_id] = self._epochs.get(camera_id, 0) + 1
+
+    def get_jpeg(self, camera_id: int) -> Optional[bytes]:
+        """
+        Returns the latest rendered overlay for a camera as JPEG bytes, or None.
+        """
+        with self._lock:
+            return self._jpegs.get(camera_id)
+
+    def _run(self):
+        while True:
+            camera_id = self._queue.get()
+            with self._lock:
+                item = self._pending.pop(camera_id, None)
+                epoch = self._epochs.get(camera_id, 0)
+            if item is None:
+                continue
+            try:
+                jpeg = self._render(*item, self.max_width)
+            except Exception as e:
+                logger.error(f"Failed to render annotation for camera {camera_id}: {e}")
+                continue
+            with self._lock:
+                if self._epochs.get(camera_id, 0) == epoch:
+                    self._jpegs[camera_id] = jpeg
+
+    @staticmethod
+    def _render(frame, detections: list, max_width: int = 0) -> bytes:
+        import cv2
+        h, w = frame.shape[:2]
+        scale = 1.0
+        if max_width and w > max_width:
+            scale = max_width / w
+            img = cv2.resize(frame, (max_width, max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+        else:
+            img = frame.copy()
+        for box, in_zone in detections:
+            # Detections are in full-frame pixels
+            x1, y1, x2, y2 = (v * scale for v in box)
+            center_x = (x1 + x2) / 2
+            center_y = (y1 + y2) / 2
+            # Draw box
+            cv2.rectangle(img, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
+            cv2.circle(img, (int(center_x), int(center_y)), 5, (0, 0, 255), -1)
+            # Label status
+            label = "Counted" if in_zone else "Ignored"
+            color = (0, 255, 0) if in_zone else (0, 0, 255)
+            cv2.putText(img, label, (int(x1), int(y1)-10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, color, 2)
+        _, encoded = cv2.imencode('.jpg', img)
+        return encoded.tobytes()
+
+annotator = Annotator()
@@ -0,0 +1,86 @@
+import importlib.util
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Which runtime executes the detector: pytorch | onnx | openvino | openvino-int8
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "pytorch").lower()
+# Reference weights; exported models are cached next to them and reused on later starts
+MODEL_WEIGHTS = os.getenv("YOLO_WEIGHTS", "yolov8n.pt")
+
+BACKENDS = ("pytorch", "onnx", "openvino", "openvino-int8")
+
+# Runtime package each exported backend needs at inference time
+_RUNTIME_PACKAGE = {
+    "onnx": "onnxruntime",
+    "openvino": "openvino",
+    "openvino-int8": "openvino",
+}
+
+
+def is_available(backend: str) -> bool:
+    package = _RUNTIME_PACKAGE.get(backend)
+    return package is None or importlib.util.find_spec(package) is not None
+
+
+def exported_path(backend: str, weights: str = MODEL_WEIGHTS) -> str:
+    """
+    Where ultralytics writes the export of `weights` for this backend.
+    """
+    stem, _ = os.path.splitext(weights)
+    if backend == "onnx":
+        return f"{stem}.onnx"
+    if backend == "openvino":
+        return f"{stem}_openvino_model"
+    if backend == "openvino-int8":
+        return f"{stem}_int8_openvino_model"
+    return weights
+
+
+def export_model(backend: str, weights: str = MODEL_WEIGHTS) -> str:
+    """
+    Exports the reference weights for `backend` once and returns the cached model path.
+    """
+    path = exported_path(backend, weights)
+    if backend == "pytorch" or os.path.exists(path):
+        return path
+
+    from ultralytics import YOLO
+    logger.info(f"Exporting {weights} for the {backend} backend (one-time)...")
+    model = YOLO(weights)
+    if backend == "onnx":
+        # Dynamic axes so a whole capture round runs as one batch
+        exported = model.export(format="onnx", dynamic=True)
+    elif backend == "openvino":
+        exported = model.export(format="openvino")
+    else:
+        # Post-training int8 quantization; calibrates on ultralytics' default dataset
+        exported = model.export(format="openvino", int8=True)
+    logger.info(f"Exported model cached at {exported}")
+    return str(exported)
+
+
+def load_model(backend: str = INFERENCE_BACKEND, weights: str = MODEL_WEIGHTS):
+    """
+    Returns a YOLO predictor running on the requested backend.
+    Falls back to the PyTorch reference when the runtime is missing or the export fails,
+    so a misconfigured box still counts people.
+    Returns (model, backend actually used).
+    """
+    from ultralytics import YOLO
+
+    if backend not in BACKENDS:
+        logger.warning(f"Unknown INFERENCE_BACKEND '{backend}', using pytorch")
+        backend = "pytorch"
+
+    if backend != "pytorch":
+        if not is_available(backend):
+            logger.warning(f"{_RUNTIME_PACKAGE[backend]} is not installed, using pytorch")
+        else:
+            try:
+                return YOLO(export_model(backend, weights), task="detect"), backend
+            except Exception as e:
+                logger.error(f"Failed to load {backend} backend: {e}. Using pytorch")
+
+    return YOLO(weights), "pytorch"
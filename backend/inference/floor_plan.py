@@ -0,0 +1,143 @@
+import logging
+import os
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+import shapely
+
+logger = logging.getLogger(__name__)
+
+# Two detections from different cameras closer than this on the floor plan are one person.
+# Same unit as the homographies' output (e.g. metres).
+DEDUP_RADIUS = float(os.getenv("DEDUP_RADIUS", "0.5"))
+
+
+def parse_homography(matrix) -> Optional[np.ndarray]:
+    """
+    Validates a camera's homography: a 3x3 matrix mapping normalized image
+    coordinates (x, y in 0..1) to hall floor-plan coordinates. Returns None if unusable.
+    """
+    if not matrix:
+        return None
+    try:
+        h = np.asarray(matrix, dtype=float)
+    except (TypeError, ValueError):
+        return None
+    if h.shape != (3, 3) or not np.isfinite(h).all() or abs(np.linalg.det(h)) < 1e-12:
+        return None
+    return h
+
+
+def project(h: np.ndarray, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+    """
+    Maps normalized image points through the homography. Returns (N, 2) floor points.
+    """
+    pts = np.stack([xs, ys, np.ones(len(xs))], axis=1) @ h.T
+    w = pts[:, 2:3]
+    w = np.where(np.abs(w) < 1e-12, 1e-12, w)
+    return pts[:, :2] / w
+
+
+def floor_points(h: np.ndarray, detections: list, img_shape: tuple) -> np.ndarray:
+    """
+    Floor positions of the in-zone people of one frame. A person stands on the bottom
+    centre of their box, which is the point that lies on the floor plane.
+    """
+    boxes = np.array([box for box, in_zone in detections if in_zone], dtype=float).reshape(-1, 4)
+    img_h, img_w = img_shape[:2]
+    return project(h, (boxes[:, 0] + boxes[:, 2]) / 2 / img_w, boxes[:, 3] / img_h)
+
+
+def find_duplicates(points_by_camera: Dict[int, np.ndarray], radius: float = DEDUP_RADIUS) -> Dict[int, int]:
+    """
+    Groups detections that different cameras see at the same spot and returns
+    camera_id -> how many of its detections another camera already counts.
+
+    Candidate pairs come from an STRtree query, so a round with hundreds of detections
+    never compares all pairs. Pairs are merged closest first, and a group never holds two
+    detections from one camera (people standing close together in one view stay distinct).
+    Each group is owned by its lowest camera id; the other members are the duplicates.
+    """
+    cams = [cam_id for cam_id, pts in points_by_camera.items() if len(pts)]
+    duplicates = {cam_id: 0 for cam_id in points_by_camera}
+    if len(cams) < 2:
+        return duplicates
+
+    coords = np.concatenate([points_by_camera[c] for c in cams])
+    owner = np.concatenate([np.full(len(points_by_camera[c]), c) for c in cams])
+    tree = shapely.STRtree(shapely.points(coords))
+    left, right = tree.query(shapely.points(coords), predicate="dwithin", distance=radius)
+    pairs = (left < right) & (owner[left] != owner[right])
+    left, right = left[pairs], right[pairs]
+    order = np.argsort(np.linalg.norm(coords[left] - coords[right], axis=1))
+
+    parent = list(range(len(coords)))
+    members = [{owner[i]} for i in range(len(coords))]
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for k in order:
+        a, b = root(left[k]), root(right[k])
+        if a == b or members[a] & members[b]:
+            continue
+        parent[b] = a
+        members[a] |= members[b]
+
+    for i in range(len(coords)):
+        if root(i) == i:
+            for cam_id in members[i]:
+                if cam_id != min(members[i]):
+                    duplicates[int(cam_id)] += 1
+    return duplicates
+
+
+def dedup_counts(counts: dict, duplicates: Dict[int, int]) -> Dict[int, int]:
+    """
+    camera_id -> count without the people another camera already counts, for the cameras in duplicates.
+    A camera never gives up more people than it counted, so the result stays within 0..count
+    even when its duplicates were found on a frame that saw more people than the count.
+    """
+    return {
+        cam_id: counts.get(cam_id, 0) - min(dup, counts.get(cam_id, 0))
+        for cam_id, dup in duplicates.items()
+    }
+
+
+class FloorPlanDedup:
+    """
+    Keeps each camera's latest floor points, so cameras whose count was reused
+    (no fresh detections) still take part in the round's deduplication.
+    """
+    def __init__(self, radius: float = DEDUP_RADIUS):
+        self.radius = radius
+        self._points: Dict[int, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def dedup(self, homographies: dict, detections: dict, shapes: dict) -> Dict[int, int]:
+        """
+        homographies maps camera_id -> 3x3 matrix (cameras without one are left out),
+        detections camera_id -> [((x1, y1, x2, y2), in_zone), ...] for freshly inferred cameras,
+        shapes camera_id -> frame shape. Returns camera_id -> duplicate count.
+        """
+        points = {}
+        with self._lock:
+            for cam_id, matrix in homographies.items():
+                h = parse_homography(matrix)
+                if h is None:
+                    continue
+                if cam_id in detections and cam_id in shapes:
+                    self._points[cam_id] = floor_points(h, detections[cam_id], shapes[cam_id])
+                if cam_id in self._points:
+                    points[cam_id] = self._points[cam_id]
+        return find_duplicates(points, self.radius)
+
+    def forget(self, camera_id: int):
+        with self._lock:
+            self._points.pop(camera_id, None)
+
+floor_dedup = FloorPlanDedup()
@@ -0,0 +1,140 @@
+import logging
+import os
+import threading
+from typing import Dict
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# on  - skip inference for cameras whose frame barely changed since the last inferred frame
+# off - run inference on every frame
+MOTION_GATE = os.getenv("MOTION_GATE", "on").lower() == "on"
+# Share of (downscaled) pixels that must change for a frame to count as changed
+MOTION_THRESHOLD = float(os.getenv("MOTION_THRESHOLD", "0.01"))
+# Grey-level difference for a single pixel to count as changed (absorbs sensor noise)
+MOTION_PIXEL_DELTA = int(os.getenv("MOTION_PIXEL_DELTA", "25"))
+MOTION_DOWNSCALE_WIDTH = 160
+# Run inference anyway after this many reused counts in a row, so a count can't go stale forever
+MOTION_MAX_REUSE = int(os.getenv("MOTION_MAX_REUSE", "12"))
+
+
+def _signature(frame: np.ndarray) -> np.ndarray:
+    """
+    Small blurred greyscale copy of the frame that frame differencing works on.
+    """
+    h, w = frame.shape[:2]
+    scale = MOTION_DOWNSCALE_WIDTH / w
+    small = cv2.resize(frame, (MOTION_DOWNSCALE_WIDTH, max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    return cv2.GaussianBlur(small, (5, 5), 0)
+
+
+class _CameraState:
+    def __init__(self):
+        self.signature = None  # of the last frame that went through inference
+        self.count = None
+        self.reused_in_row = 0
+        self.checked = 0
+        self.skipped = 0
+        self.last_change = None
+
+
+class MotionGate:
+    """
+    Cheap pre-filter in front of inference. Each frame is compared with the camera's
+    last inferred frame; when less than MOTION_THRESHOLD of the pixels changed,
+    the previous count is reused instead of running the model.
+    """
+    def __init__(self, enabled: bool = MOTION_GATE, threshold: float = MOTION_THRESHOLD):
+        self.enabled = enabled
+        self.threshold = threshold
+        self._cameras: Dict[int, _CameraState] = {}
+        self._pending: Dict[int, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def split(self, frames: dict) -> tuple:
+        """
+        frames maps camera_id -> frame, or -> [frames] for bursts (the newest one is compared).
+        Returns (frames that need inference, camera_id -> reused count).
+        """
+        if not self.enabled:
+            return frames, {}
+
+        to_infer = {}
+        reused = {}
+        for cam_id, frame in frames.items():
+            latest = frame[-1] if isinstance(frame, list) else frame
+            if not isinstance(latest, np.ndarray):
+                to_infer[cam_id] = frame
+                continue
+            signature = _signature(latest)
+
+            with self._lock:
+                state = self._cameras.setdefault(cam_id, _CameraState())
+                state.checked += 1
+                if state.signature is not None and state.signature.shape == signature.shape:
+                    diff = cv2.absdiff(signature, state.signature)
+                    state.last_change = float(np.count_nonzero(diff > MOTION_PIXEL_DELTA)) / diff.size
+                    if state.last_change < self.threshold and state.reused_in_row < MOTION_MAX_REUSE:
+                        state.skipped += 1
+                        state.reused_in_row += 1
+                        reused[cam_id] = state.count
+                        continue
+                self._pending[cam_id] = signature
+            to_infer[cam_id] = frame
+        return to_infer, reused
+
+    def update(self, counts: dict, failed=()):
+        """
+        Stores the fresh counts (and the frames they came from) as the new reference.
+        Cameras in failed got a placeholder count from a failed inference; their frame is
+        dropped so the next round runs inference again instead of reusing that count.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            for cam_id in failed:
+                self._pending.pop(cam_id, None)
+            for cam_id, count in counts.items():
+                if cam_id in failed:
+                    continue
+                signature = self._pending.pop(cam_id, None)
+                state = self._cameras.get(cam_id)
+                if signature is None or state is None:
+                    continue
+                state.signature = signature
+                state.count = count
+                state.reused_in_row = 0
+
+    def forget(self, camera_id: int):
+        """
+        Drops a camera's reference frame, e.g. after its zones or stream changed.
+        """
+        with self._lock:
+            state = self._cameras.get(camera_id)
+            if state is not None:
+                state.signature = None
+                state.count = None
+                state.reused_in_row = 0
+            self._pending.pop(camera_id, None)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "threshold": self.threshold,
+                "cameras": {
+                    cam_id: {
+                        "checked": s.checked,
+                        "skipped": s.skipped,
+                        "skip_rate": s.skipped / s.checked if s.checked else 0.0,
+                        "last_change": s.last_change,
+                    }
+                    for cam_id, s in self._cameras.items()
+                },
+            }
+
+motion_gate = MotionGate()
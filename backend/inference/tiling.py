@@ -0,0 +1,120 @@
+import logging
+import math
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .tracker import iou_matrix
+
+logger = logging.getLogger(__name__)
+
+# full - the whole frame goes to the model (default)
+# crop - only the bounding box of the camera's zones (plus a margin)
+# tile - like crop, but crops larger than TILE_SIZE are split into overlapping tiles
+INFERENCE_REGION_MODE = os.getenv("INFERENCE_REGION_MODE", "full").lower()
+# Margin around the zone bounding box, as a share of the frame, so people on the edge keep their whole box
+CROP_MARGIN = float(os.getenv("CROP_MARGIN", "0.05"))
+# Longest tile side in pixels, and how much neighbouring tiles overlap
+TILE_SIZE = int(os.getenv("TILE_SIZE", "1280"))
+TILE_OVERLAP = float(os.getenv("TILE_OVERLAP", "0.15"))
+# Cross-tile NMS: boxes from neighbouring tiles overlapping more than this (IoU), or a box mostly
+# inside another (intersection over the smaller box, e.g. a person cut at a tile edge), are merged
+NMS_IOU_THRESHOLD = 0.5
+NMS_IOS_THRESHOLD = 0.8
+
+Region = Tuple[int, int, int, int]
+
+
+def _crop_box(width: int, height: int, bounds) -> Region:
+    min_x, min_y, max_x, max_y = bounds
+    x0 = max(0, int(math.floor((min_x - CROP_MARGIN) * width)))
+    y0 = max(0, int(math.floor((min_y - CROP_MARGIN) * height)))
+    x1 = min(width, int(math.ceil((max_x + CROP_MARGIN) * width)))
+    y1 = min(height, int(math.ceil((max_y + CROP_MARGIN) * height)))
+    if x1 - x0 < 2 or y1 - y0 < 2:
+        return 0, 0, width, height
+    return x0, y0, x1, y1
+
+
+def _axis_tiles(start: int, end: int) -> List[Tuple[int, int]]:
+    length = end - start
+    if length <= TILE_SIZE:
+        return [(start, end)]
+    stride = int(TILE_SIZE * (1 - TILE_OVERLAP))
+    n = math.ceil((length - TILE_SIZE) / stride) + 1
+    # Spread the tiles evenly so the last one ends exactly at the edge
+    step = (length - TILE_SIZE) / (n - 1)
+    return [(start + int(round(i * step)), start + int(round(i * step)) + TILE_SIZE) for i in range(n)]
+
+
+def plan_regions(frame_shape: tuple, bounds: Optional[tuple], mode: str = INFERENCE_REGION_MODE) -> List[Region]:
+    """
+    Pixel regions (x0, y0, x1, y1) of a frame to run the model on.
+    bounds is the normalized zone bounding box (CompiledZones.bounds), None for the whole frame.
+    """
+    height, width = frame_shape[:2]
+    if mode == "full" or (bounds is None and mode == "crop"):
+        return [(0, 0, width, height)]
+
+    x0, y0, x1, y1 = (0, 0, width, height) if bounds is None else _crop_box(width, height, bounds)
+    if mode != "tile":
+        return [(x0, y0, x1, y1)]
+    return [(tx0, ty0, tx1, ty1) for ty0, ty1 in _axis_tiles(y0, y1) for tx0, tx1 in _axis_tiles(x0, x1)]
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, region_ids: np.ndarray, regions: np.ndarray) -> np.ndarray:
+    """
+    Greedy non-maximum suppression over boxes gathered from several tiles.
+    region_ids holds each box's index into regions, the (R, 4) pixel regions it came from.
+    Only boxes from different regions whose overlap lies in the strip the two regions share
+    can suppress each other; the model's own NMS already handled boxes within one region,
+    and occluded people standing close together there must stay separate.
+    Returns the indices of the kept boxes, best score first.
+    """
+    order = np.argsort(-scores)
+    boxes = boxes[order]
+    region_ids = region_ids[order]
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    ious = iou_matrix(boxes, boxes)
+    x1 = np.maximum(boxes[:, None, 0], boxes[None, :, 0])
+    y1 = np.maximum(boxes[:, None, 1], boxes[None, :, 1])
+    x2 = np.minimum(boxes[:, None, 2], boxes[None, :, 2])
+    y2 = np.minimum(boxes[:, None, 3], boxes[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    ios = inter / np.maximum(np.minimum(areas[:, None], areas[None, :]), 1e-9)
+
+    # Overlap strip of each pair's regions (empty for regions that don't overlap)
+    r = regions[region_ids]
+    sx1 = np.maximum(r[:, None, 0], r[None, :, 0])
+    sy1 = np.maximum(r[:, None, 1], r[None, :, 1])
+    sx2 = np.minimum(r[:, None, 2], r[None, :, 2])
+    sy2 = np.minimum(r[:, None, 3], r[None, :, 3])
+    in_strip = (np.minimum(x2, sx2) > np.maximum(x1, sx1)) & (np.minimum(y2, sy2) > np.maximum(y1, sy1))
+    candidates = (region_ids[:, None] != region_ids[None, :]) & in_strip
+    duplicate = candidates & ((ious > NMS_IOU_THRESHOLD) | (ios > NMS_IOS_THRESHOLD))
+
+    suppressed = np.zeros(len(boxes), dtype=bool)
+    keep = []
+    for i in range(len(boxes)):
+        if suppressed[i]:
+            continue
+        keep.append(i)
+        suppressed |= duplicate[i]
+    return order[keep]
+
+
+def merge_regions(parts: list) -> np.ndarray:
+    """
+    parts holds (region, boxes, scores) per region, boxes already in full-frame coordinates.
+    Returns the merged (N, 4) boxes; with several regions, duplicates from overlaps are suppressed.
+    """
+    if not parts:
+        return np.zeros((0, 4))
+    boxes = np.concatenate([b for _, b, _ in parts]).reshape(-1, 4)
+    if len(parts) == 1 or len(boxes) < 2:
+        return boxes
+    scores = np.concatenate([s for _, _, s in parts])
+    region_ids = np.concatenate([np.full(len(b), i) for i, (_, b, _) in enumerate(parts)])
+    regions = np.array([region for region, _, _ in parts], dtype=float).reshape(-1, 4)
+    return boxes[nms(boxes, scores, region_ids, regions)]
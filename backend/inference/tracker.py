@@ -0,0 +1,191 @@
+import logging
+import os
+from typing import Dict, List
+
+import numpy as np
+
+from .annotator import annotator
+
+logger = logging.getLogger(__name__)
+
+# How a burst of frames becomes one count:
+# median - median of the per-frame counts
+# track  - link detections across frames and count people seen on enough frames
+BURST_COUNT_METHOD = os.getenv("BURST_COUNT_METHOD", "track").lower()
+
+# Minimum IoU to continue a track from one frame to the next
+TRACK_IOU_THRESHOLD = 0.3
+# Fallback match when boxes no longer overlap: center moved less than this many box diagonals
+TRACK_CENTROID_RATIO = 0.5
+# A track must be seen on this share of the burst (at least 2 frames) to count
+TRACK_MIN_HIT_RATIO = 0.4
+
+
+def camera_of(key):
+    """
+    Frame keys are camera ids, or (camera_id, frame_index) for burst frames.
+    """
+    return key[0] if isinstance(key, tuple) else key
+
+
+def burst_frames(bursts: dict) -> dict:
+    """
+    Flattens camera_id -> [frames] into (camera_id, frame_index) -> frame for one batched pass.
+    """
+    return {(cam_id, i): frame for cam_id, frames in bursts.items() for i, frame in enumerate(frames)}
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Pairwise IoU of (N, 4) and (M, 4) xyxy boxes.
+    """
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+class _Track:
+    def __init__(self, box, in_zone: bool, frame_index: int):
+        self.box = np.asarray(box, dtype=float)
+        self.frames = {frame_index: in_zone}
+
+    def update(self, box, in_zone: bool, frame_index: int):
+        self.box = np.asarray(box, dtype=float)
+        self.frames[frame_index] = in_zone
+
+
+def _match(tracks: List[_Track], boxes: np.ndarray) -> dict:
+    """
+    Greedy association of detections to tracks: highest IoU first,
+    then nearest center for what is left. Returns detection index -> track.
+    """
+    if not tracks or not len(boxes):
+        return {}
+    track_boxes = np.array([t.box for t in tracks])
+    matches = {}
+    used = set()
+
+    ious = iou_matrix(track_boxes, boxes)
+    for flat in np.argsort(-ious, axis=None):
+        ti, di = np.unravel_index(flat, ious.shape)
+        if ious[ti, di] < TRACK_IOU_THRESHOLD:
+            break
+        if ti in used or di in matches:
+            continue
+        matches[di] = tracks[ti]
+        used.add(ti)
+
+    t_centers = (track_boxes[:, :2] + track_boxes[:, 2:]) / 2
+    d_centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+    diagonals = np.hypot(track_boxes[:, 2] - track_boxes[:, 0], track_boxes[:, 3] - track_boxes[:, 1])
+    dist = np.linalg.norm(t_centers[:, None, :] - d_centers[None, :, :], axis=2) / np.maximum(diagonals[:, None], 1e-9)
+    for flat in np.argsort(dist, axis=None):
+        ti, di = np.unravel_index(flat, dist.shape)
+        if dist[ti, di] > TRACK_CENTROID_RATIO:
+            break
+        if ti in used or di in matches:
+            continue
+        matches[di] = tracks[ti]
+        used.add(ti)
+    return matches
+
+
+def track_count(frame_detections: List[list]) -> int:
+    """
+    Counts people across a burst. frame_detections holds, per frame in time order,
+    the detections as [((x1, y1, x2, y2), in_zone), ...].
+
+    Detections are linked into tracks; tracks seen on too few frames (flicker,
+    false positives) are dropped. A kept track also counts on the frames between
+    its first and last sighting, so a person occluded for a frame is not lost.
+    The result is the median over frames of the in-zone tracks present.
+    """
+    n_frames = len(frame_detections)
+    if n_frames == 0:
+        return 0
+
+    tracks: List[_Track] = []
+    for t, dets in enumerate(frame_detections):
+        boxes = np.array([box for box, _ in dets], dtype=float).reshape(-1, 4)
+        # Only tracks seen on the previous two frames can be continued
+        active = [tr for tr in tracks if max(tr.frames) >= t - 2]
+        matches = _match(active, boxes)
+        for di, (box, in_zone) in enumerate(dets):
+            track = matches.get(di)
+            if track is None:
+                tracks.append(_Track(box, in_zone, t))
+            else:
+                track.update(box, in_zone, t)
+
+    min_hits = max(2, int(np.ceil(TRACK_MIN_HIT_RATIO * n_frames))) if n_frames > 1 else 1
+    per_frame = np.zeros(n_frames)
+    for track in tracks:
+        if len(track.frames) < min_hits:
+            continue
+        seen = sorted(track.frames)
+        in_zone = None
+        for t in range(seen[0], seen[-1] + 1):
+            # Gaps keep the zone state of the last sighting
+            in_zone = track.frames.get(t, in_zone)
+            if in_zone:
+                per_frame[t] += 1
+    return int(round(float(np.median(per_frame))))
+
+
+def burst_counts(bursts: dict, counts: dict, detections: dict, method: str = BURST_COUNT_METHOD) -> Dict[int, int]:
+    """
+    Reduces per-frame results keyed by (camera_id, frame_index) to one count per camera.
+    Tracking needs detections for every frame; without them the median is used.
+    """
+    out = {}
+    for cam_id, frames in bursts.items():
+        keys = [(cam_id, i) for i in range(len(frames))]
+        if method == "track" and all(k in detections for k in keys):
+            out[cam_id] = track_count([detections[k] for k in keys])
+        else:
+            out[cam_id] = int(round(float(np.median([counts.get(k, 0) for k in keys])))) if keys else 0
+    return out
+
+
+def burst_keep(bursts: dict, method: str, every_frame: bool = False) -> tuple:
+    """
+    Returns (frame keys whose detections are needed, cameras to annotate).
+    Tracking needs every frame, and so does every_frame=True (see count_detections);
+    otherwise only the newest frame of each annotated burst is kept for the overlay.
+    """
+    annotate = {cam_id for cam_id, frames in bursts.items() if frames and annotator.wants(cam_id)}
+    keep = {(cam_id, len(frames) - 1) for cam_id, frames in bursts.items() if frames and cam_id in annotate}
+    if method == "track" or every_frame:
+        keep |= set(burst_frames(bursts))
+    return keep, annotate
+
+
+def count_detections(bursts: dict, detections: dict, counts: dict) -> dict:
+    """
+    camera_id -> the detections of one burst frame that agrees with the camera's burst count:
+    the newest frame with exactly `counts[camera_id]` people in the zones, else the newest frame.
+    Floor-plan dedup works on these, so the duplicates it subtracts come from the same
+    people the (median or tracked) count is made of rather than from whatever the newest frame saw.
+    """
+    out = {}
+    for cam_id, frames in bursts.items():
+        keys = [(cam_id, i) for i in range(len(frames)) if (cam_id, i) in detections]
+        if not keys:
+            continue
+        matching = [k for k in keys if sum(1 for _, in_zone in detections[k] if in_zone) == counts.get(cam_id)]
+        out[cam_id] = detections[(matching or keys)[-1]]
+    return out
+
+
+def record_burst_annotations(bursts: dict, detections: dict, annotate: set):
+    for cam_id in annotate:
+        frames = bursts[cam_id]
+        dets = detections.get((cam_id, len(frames) - 1))
+        if dets is not None and isinstance(frames[-1], np.ndarray):
+            annotator.record(cam_id, frames[-1], dets)
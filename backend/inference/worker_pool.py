@@ -0,0 +1,207 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .annotator import annotator
+from .tracker import BURST_COUNT_METHOD, burst_counts, burst_frames, burst_keep, camera_of, count_detections, record_burst_annotations
+from .zone_index import CompiledZones
+
+logger = logging.getLogger(__name__)
+
+# Number of inference worker processes. 0 runs inference inside the API process.
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+
+# Engine living in each worker process, built by _init_worker
+_worker_engine = None
+
+
+def _init_worker(threads: int):
+    """
+    Runs once in each worker process. Splits the CPU cores between workers
+    so they don't oversubscribe each other, then loads the model.
+    """
+    global _worker_engine
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+    from .yolo_engine import InferenceEngine
+    _worker_engine = InferenceEngine()
+    _worker_engine.ensure_loaded()
+
+
+def _worker_detect(frames: dict, zones_per_camera: dict, keep_detections: set) -> tuple:
+    return _worker_engine.detect_batch(frames, zones_per_camera, keep_detections)
+
+
+def _worker_status() -> dict:
+    return _worker_engine.status()
+
+
+class InferenceWorkerPool:
+    """
+    Runs YOLO in separate worker processes so inference never competes with
+    request handling for the API process's GIL and CPU.
+    Frames go to the workers over the executor's local call queue and counts come back;
+    a round is split across workers so throughput scales with cores.
+    """
+    def __init__(self, workers: int = INFERENCE_WORKERS):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._status = {"state": "not_loaded", "backend": None, "workers": workers, "error": None}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                threads = max(1, (os.cpu_count() or 1) // self.workers)
+                # spawn: never fork a process that already runs uvicorn/scheduler threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(threads,),
+                )
+            return self._executor
+
+    def _reset(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def warm_up(self):
+        """
+        Starts the worker processes and waits for their models to load.
+        """
+        if self.workers == 0:
+            from .yolo_engine import inference_engine
+            inference_engine.warm_up()
+            return
+
+        self._status["state"] = "loading"
+        try:
+            executor = self._get_executor()
+            futures = [executor.submit(_worker_status) for _ in range(self.workers)]
+            statuses = [f.result() for f in futures]
+            failed = [s for s in statuses if s["state"] != "ready"]
+            self._status.update(
+                state="failed" if failed else "ready",
+                backend=statuses[0]["backend"],
+                error=failed[0]["error"] if failed else None,
+            )
+        except Exception as e:
+            logger.error(f"Inference workers failed to start: {e}")
+            self._status.update(state="failed", error=str(e))
+
+    def status(self) -> dict:
+        if self.workers == 0:
+            from .yolo_engine import inference_engine
+            return inference_engine.status()
+        return dict(self._status)
+
+    def detect_people_batch(self, frames: dict, zones_per_camera: dict, detections_out: dict = None,
+                            failed_out: set = None) -> dict:
+        """
+        Same contract as InferenceEngine.detect_people_batch, executed in the worker pool.
+        """
+        if self.workers == 0:
+            from .yolo_engine import inference_engine
+            return inference_engine.detect_people_batch(frames, zones_per_camera, detections_out, failed_out)
+        if not frames:
+            return {}
+
+        annotate = {cam_id for cam_id in frames if annotator.wants(cam_id)}
+        keep = set(frames) if detections_out is not None else annotate
+        counts, detections, failed = self._detect(frames, zones_per_camera, keep)
+        # Overlay is rendered later in this process, from the frame we already hold
+        for cam_id in annotate:
+            if cam_id in detections:
+                annotator.record(cam_id, frames[cam_id], detections[cam_id])
+        if detections_out is not None:
+            detections_out.update(detections)
+        if failed_out is not None:
+            failed_out.update(failed)
+        return counts
+
+    def detect_people_burst(self, bursts: dict, zones_per_camera: dict, method: str = BURST_COUNT_METHOD,
+                            detections_out: dict = None, failed_out: set = None) -> dict:
+        """
+        Same contract as InferenceEngine.detect_people_burst, executed in the worker pool.
+        """
+        if self.workers == 0:
+            from .yolo_engine import inference_engine
+            return inference_engine.detect_people_burst(bursts, zones_per_camera, method, detections_out, failed_out)
+        if not bursts:
+            return {}
+
+        keep, annotate = burst_keep(bursts, method, every_frame=detections_out is not None)
+        counts, detections, failed = self._detect(burst_frames(bursts), zones_per_camera, keep)
+        record_burst_annotations(bursts, detections, annotate)
+        result = burst_counts(bursts, counts, detections, method)
+        if detections_out is not None:
+            detections_out.update(count_detections(bursts, detections, result))
+        if failed_out is not None:
+            failed_out.update(camera_of(key) for key in failed)
+        return result
+
+    def _detect(self, frames: dict, zones_per_camera: dict, keep: set) -> tuple:
+        """
+        Splits frames across the workers and merges their (counts, detections, failed keys).
+        Frames of a worker that crashed or raised count as failed.
+        """
+        # Ship raw zone points; workers keep their own compiled cache keyed on the geometry
+        zones = {
+            cam_id: z.points if isinstance(z, CompiledZones) else z
+            for cam_id, z in zones_per_camera.items()
+        }
+
+        # One chunk per worker
+        keys = list(frames.keys())
+        n = min(self.workers, len(keys))
+        chunks = [keys[i::n] for i in range(n)]
+
+        counts = {}
+        detections = {}
+        failed = set()
+        try:
+            executor = self._get_executor()
+            futures = [
+                executor.submit(
+                    _worker_detect,
+                    {k: frames[k] for k in chunk},
+                    {camera_of(k): zones.get(camera_of(k), []) for k in chunk},
+                    keep & set(chunk),
+                )
+                for chunk in chunks
+            ]
+            for future in futures:
+                chunk_counts, chunk_detections, chunk_failed = future.result()
+                counts.update(chunk_counts)
+                detections.update(chunk_detections)
+                failed.update(chunk_failed)
+        except BrokenProcessPool as e:
+            logger.error(f"Inference worker crashed: {e}. Restarting pool.")
+            self._reset()
+        except Exception as e:
+            logger.error(f"Inference failed: {e}")
+
+        for key in keys:
+            if key not in counts:
+                failed.add(key)
+                counts[key] = 0
+        return counts, detections, failed
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+inference_pool = InferenceWorkerPool()
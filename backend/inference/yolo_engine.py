@@ -1,111 +1,257 @@
 import logging
+import threading
 import numpy as np
-from ultralytics import YOLO
-from shapely.geometry import Point, Polygon
+
+from .annotator import annotator
+from .backends import INFERENCE_BACKEND, load_model as load_backend_model
+from .tiling import INFERENCE_REGION_MODE, merge_regions, plan_regions
+from .tracker import BURST_COUNT_METHOD, burst_counts, burst_frames, burst_keep, camera_of, count_detections, record_burst_annotations
+from .zone_index import CompiledZones, zone_index
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on frames per forward pass, keeps CPU memory flat on large halls
+MAX_BATCH_SIZE = 16
+
 class InferenceEngine:
-    def __init__(self):
+    """
+    The model is not loaded on construction. It loads on first use (ensure_loaded),
+    or earlier if the API lifespan kicks off warm_up() in the background.
+    """
+    def __init__(self, backend: str = INFERENCE_BACKEND, region_mode: str = INFERENCE_REGION_MODE):
         self.model = None
-        self.load_model()
+        # full | crop | tile, see tiling.plan_regions
+        self.region_mode = region_mode
+        self.requested_backend = backend
+        self.backend = None
+        # not_loaded -> loading -> ready | failed
+        self.state = "not_loaded"
+        self.load_error = None
+        self._load_lock = threading.Lock()
+        # The model object isn't safe for concurrent calls (several schedules may run at once)
+        self._infer_lock = threading.Lock()
 
     def load_model(self):
         print("--- [DEBUG] YOLOEngine: Loading Model... ---")
-        logger.info("Loading YOLOv8 Model (Nano)...")
+        logger.info(f"Loading YOLOv8 Model (Nano) on the {self.requested_backend} backend...")
+        self.state = "loading"
         try:
             # Load YOLOv8n (nano) model - fast and sufficient for people counting
-            self.model = YOLO('yolov8n.pt') 
+            self.model, self.backend = load_backend_model(self.requested_backend)
+            self.state = "ready"
+            self.load_error = None
             print("--- [DEBUG] YOLOEngine: Model LOADED ---")
-            logger.info("YOLOv8 Model loaded successfully.")
+            logger.info(f"YOLOv8 Model loaded successfully ({self.backend}).")
         except Exception as e:
             logger.error(f"Failed to load YOLOv8 model: {e}")
             self.model = None
+            self.state = "failed"
+            self.load_error = str(e)
+
+    def ensure_loaded(self) -> bool:
+        """
+        Loads the model on first call; concurrent callers wait for the same load.
+        Returns True when the model is ready.
+        """
+        if self.model is None:
+            with self._load_lock:
+                if self.model is None:
+                    self.load_model()
+        return self.model is not None
+
+    def warm_up(self):
+        """
+        Loads the model ahead of the first capture round. Safe to run on a background thread.
+        """
+        self.ensure_loaded()
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "backend": self.backend,
+            "requested_backend": self.requested_backend,
+            "region_mode": self.region_mode,
+            "error": self.load_error,
+        }
 
-    def detect_people(self, image_path: str, zones: list) -> int:
+    def detect_people(self, image, zones: list) -> int:
         """
         Runs detection on the image using YOLOv8.
+        image may be a BGR numpy frame (counted in memory) or an image path.
         Filters results to count only people (class 0) that are inside the specified zones.
         """
-        if self.model is None:
+        return self.detect_people_batch({0: image}, {0: zones}).get(0, 0)
+
+    def detect_people_batch(self, frames: dict, zones_per_camera: dict, detections_out: dict = None,
+                            failed_out: set = None) -> dict:
+        """
+        Runs one batched YOLO forward pass over a whole capture round.
+        frames maps camera_id -> image (path or BGR numpy array),
+        zones_per_camera maps camera_id -> CompiledZones or a list of zone point lists.
+        If detections_out is given, it is filled with camera_id -> detections for every frame.
+        If failed_out is given, it receives the cameras whose inference failed (their count is 0).
+        Returns camera_id -> people count.
+        """
+        annotate = {cam_id for cam_id in frames if annotator.wants(cam_id)}
+        keep = set(frames) if detections_out is not None else annotate
+        counts, detections, failed = self.detect_batch(frames, zones_per_camera, keep)
+
+        # Overlay is rendered later, only if someone asks for it
+        for cam_id in annotate:
+            if cam_id in detections and isinstance(frames[cam_id], np.ndarray):
+                annotator.record(cam_id, frames[cam_id], detections[cam_id])
+        if detections_out is not None:
+            detections_out.update(detections)
+        if failed_out is not None:
+            failed_out.update(failed)
+        return counts
+
+    def detect_people_burst(self, bursts: dict, zones_per_camera: dict, method: str = BURST_COUNT_METHOD,
+                            detections_out: dict = None, failed_out: set = None) -> dict:
+        """
+        Counts bursts of frames (camera_id -> [frames, oldest first]) in one batched pass
+        and reduces each burst to a single robust count (see tracker.burst_counts).
+        detections_out, if given, receives per camera the detections of the burst frame that
+        agrees with its count (see tracker.count_detections); failed_out the cameras with
+        any frame whose inference failed.
+        """
+        frames = burst_frames(bursts)
+        keep, annotate = burst_keep(bursts, method, every_frame=detections_out is not None)
+        counts, detections, failed = self.detect_batch(frames, zones_per_camera, keep)
+        record_burst_annotations(bursts, detections, annotate)
+        result = burst_counts(bursts, counts, detections, method)
+        if detections_out is not None:
+            detections_out.update(count_detections(bursts, detections, result))
+        if failed_out is not None:
+            failed_out.update(camera_of(key) for key in failed)
+        return result
+
+    def detect_batch(self, frames: dict, zones_per_camera: dict, keep_detections=()) -> tuple:
+        """
+        Core of detect_people_batch without annotation side effects, so it can run in a worker process.
+        Frame keys are camera ids or (camera_id, frame_index); zones are looked up by camera id.
+        In crop/tile mode only the zones' bounding box is sent to the model, possibly as
+        overlapping tiles whose detections are merged with NMS before the zone test.
+        Returns (camera_id -> count, camera_id -> [((x1, y1, x2, y2), in_zone), ...], failed keys)
+        where detections are only collected for cameras in keep_detections.
+        Failed keys (model not loaded, inference error) get a count of 0.
+        """
+        if not self.ensure_loaded():
             logger.error("YOLO Model not loaded")
-            return 0
+            return {cam_id: 0 for cam_id in frames}, {}, set(frames)
+
+        keys = list(frames.keys())
+        compiled = {}
+        crops = []
+        for key in keys:
+            zone_cam = camera_of(key)
+            compiled[key] = self._compile(zone_cam, zones_per_camera.get(zone_cam, []))
+            frame = frames[key]
+            if not isinstance(frame, np.ndarray):
+                # Image paths are always run whole
+                crops.append((key, 0, 0, frame))
+                continue
+            for x0, y0, x1, y1 in plan_regions(frame.shape, compiled[key].bounds, self.region_mode):
+                crops.append((key, x0, y0, frame[y0:y1, x0:x1]))
+        logger.info(f"Running YOLO batch inference on {len(keys)} frames ({len(crops)} regions)")
+
+        parts = {key: [] for key in keys}
+        shapes = {key: frames[key].shape[:2] for key in keys if isinstance(frames[key], np.ndarray)}
+        failed = set()
+        for i in range(0, len(crops), MAX_BATCH_SIZE):
+            chunk = crops[i:i + MAX_BATCH_SIZE]
+            try:
+                # classes=[0] filters for 'person' class only
+                with self._infer_lock:
+                    results = self.model([c[3] for c in chunk], classes=[0], verbose=False)
+                for (key, x0, y0, _), r in zip(chunk, results):
+                    # Box coordinates (xyxy) as an (N, 4) array, shifted back into the full frame
+                    boxes = r.boxes.xyxy.cpu().numpy().reshape(-1, 4).copy()
+                    boxes[:, [0, 2]] += x0
+                    boxes[:, [1, 3]] += y0
+                    region = (x0, y0, x0 + r.orig_shape[1], y0 + r.orig_shape[0])
+                    parts[key].append((region, boxes, r.boxes.conf.cpu().numpy().reshape(-1)))
+                    shapes.setdefault(key, r.orig_shape)
+            except Exception as e:
+                logger.error(f"Inference failed: {e}")
+                print(f"!!! YOLO INFERENCE ERROR: {e}") # VISIBLE DEBUG
+                import traceback
+                traceback.print_exc()
+                failed.update(c[0] for c in chunk)
 
-        logger.info(f"Running YOLO inference on {image_path}")
+        counts = {}
+        detections = {}
+        for key in keys:
+            if key in failed or key not in shapes:
+                failed.add(key)
+                counts[key] = 0
+                continue
+            # Tiles overlap, so the same person can come back from two of them
+            boxes = merge_regions(parts[key])
+            count, dets = self._count_boxes(boxes, shapes[key], compiled[key], key in keep_detections)
+            counts[key] = count
+            if dets is not None:
+                detections[key] = dets
+
+        return counts, detections, failed
+
+    def _compile(self, camera_id: int, zones) -> CompiledZones:
+        if isinstance(zones, CompiledZones):
+            return zones
+        return zone_index.get(camera_id, zones)
+
+    def _count_boxes(self, boxes: np.ndarray, img_shape: tuple, compiled: CompiledZones, keep_detections: bool = False) -> tuple:
+        """
+        Counts the person boxes (full-frame xyxy) of one frame that fall inside the zones.
+        All box centers are tested against the camera's compiled zones in one call.
+        Returns (count, detections or None).
+        """
+        img_h, img_w = img_shape[:2]
+
+        # Normalized center point of each person for the zone check
+        norm_x = (boxes[:, 0] + boxes[:, 2]) / 2 / img_w
+        norm_y = (boxes[:, 1] + boxes[:, 3]) / 2 / img_h
+        in_zone = compiled.contains(norm_x, norm_y)
+
+        detections = None
+        if keep_detections:
+            detections = [(tuple(b), bool(z)) for b, z in zip(boxes.tolist(), in_zone)]
         
-        try:
-            # Run inference
-            # classes=[0] filters for 'person' class only
-            results = self.model(image_path, classes=[0], verbose=False)
-            
-            count = 0
-            
-            # Parse results
-            import cv2
-            debug_img = cv2.imread(image_path)
-            
-            for r in results:
-                # Iterate through detected boxes
-                for box in r.boxes:
-                    # Get box coordinates (xyxy)
-                    x1, y1, x2, y2 = box.xyxy[0].tolist()
-                    
-                    # Calculate center point of the person
-                    center_x = (x1 + x2) / 2
-                    center_y = (y1 + y2) / 2
-                    
-                    # Normalize for zone check
-                    img_h, img_w = r.orig_shape
-                    norm_x = center_x / img_w
-                    norm_y = center_y / img_h
-                    
-                    # Draw box
-                    cv2.rectangle(debug_img, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
-                    cv2.circle(debug_img, (int(center_x), int(center_y)), 5, (0, 0, 255), -1)
-                    
-                    # Check zones
-                    in_zone = False
-                    if not zones:
-                        in_zone = True
-                        count += 1
-                    else:
-                        if self.is_point_in_zone((norm_x, norm_y), zones):
-                             in_zone = True
-                             count += 1
-                    
-                    # Label status
-                    label = "Counted" if in_zone else "Ignored"
-                    color = (0, 255, 0) if in_zone else (0, 0, 255)
-                    cv2.putText(debug_img, label, (int(x1), int(y1)-10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, color, 2)
-
-            # Save debug image
-            cv2.imwrite("debug_latest_detection.jpg", debug_img)
-            
-            return count
-            
-        except Exception as e:
-            logger.error(f"Inference failed: {e}")
-            print(f"!!! YOLO INFERENCE ERROR: {e}") # VISIBLE DEBUG
-            import traceback
-            traceback.print_exc()
-            return 0
+        return int(in_zone.sum()), detections
 
     def is_point_in_zone(self, point, zone_points_list):
         """
         Checks if a normalized point (x, y) is inside any of the polygons in zone_points_list.
         """
-        p = Point(point)
-        for zone_pts in zone_points_list:
-            if not zone_pts or len(zone_pts) < 3:
-                continue
-            
-            # Create a polygon from the zone points
-            # zone_pts is already [[x,y], [x,y]...]
-            poly = Polygon(zone_pts)
-            if poly.contains(p):
-                return True
-                
-        return False
-
-# Singleton instance
+        if not zone_points_list:
+            return False
+        mask = CompiledZones(zone_points_list).contains(np.array([point[0]]), np.array([point[1]]))
+        return bool(mask[0])
+
+def check_parity(frames: dict, backend: str, tolerance: int = 1) -> dict:
+    """
+    Runs the same frames through the PyTorch reference and `backend` and compares
+    whole-frame person counts. Returns a report with per-frame counts and whether
+    every difference is within `tolerance`.
+    """
+    reference = InferenceEngine("pytorch")
+    candidate = InferenceEngine(backend)
+    ref_counts = reference.detect_people_batch(frames, {})
+    cand_counts = candidate.detect_people_batch(frames, {})
+
+    mismatches = {
+        key: (ref_counts[key], cand_counts[key])
+        for key in frames
+        if abs(ref_counts[key] - cand_counts[key]) > tolerance
+    }
+    return {
+        "backend": candidate.backend,
+        "frames": len(frames),
+        "reference_counts": ref_counts,
+        "backend_counts": cand_counts,
+        "mismatches": mismatches,
+        "ok": candidate.backend == backend and not mismatches,
+    }
+
+# Singleton instance (model loads lazily, see InferenceEngine.ensure_loaded)
 inference_engine = InferenceEngine()
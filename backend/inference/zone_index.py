@@ -0,0 +1,116 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+import shapely
+from shapely.geometry import Polygon
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on cameras whose compiled zones are kept in memory
+MAX_CACHED_CAMERAS = 256
+
+
+def zone_version(zone_points_list: list) -> int:
+    """
+    Cheap fingerprint of a camera's zone geometry, used as the cache key.
+    """
+    return hash(tuple(tuple(tuple(p) for p in pts) for pts in zone_points_list if pts))
+
+
+class CompiledZones:
+    """
+    A camera's zones compiled once into prepared shapely polygons.
+    Tests all detection centers of a frame in one vectorized call.
+    """
+    def __init__(self, zone_points_list: list):
+        # No zones at all means "count everything"; zones that are all invalid count nothing
+        self.has_zones = bool(zone_points_list)
+        # Raw geometry is kept so the zones can be shipped to inference worker processes
+        self.points = zone_points_list or []
+        self.polygons = []
+        for zone_pts in zone_points_list or []:
+            if not zone_pts or len(zone_pts) < 3:
+                continue
+            # zone_pts is already [[x,y], [x,y]...]
+            poly = Polygon(zone_pts)
+            shapely.prepare(poly)
+            self.polygons.append(poly)
+
+    @property
+    def bounds(self) -> Optional[Tuple[float, float, float, float]]:
+        """
+        Normalized (min_x, min_y, max_x, max_y) around all zones, or None when the whole frame counts.
+        """
+        if not self.has_zones or not self.polygons:
+            return None
+        boxes = np.array([poly.bounds for poly in self.polygons])
+        return (float(boxes[:, 0].min()), float(boxes[:, 1].min()),
+                float(boxes[:, 2].max()), float(boxes[:, 3].max()))
+
+    def contains(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """
+        Returns a boolean mask of which normalized (x, y) points fall inside any zone.
+        """
+        if not self.has_zones:
+            return np.ones(len(xs), dtype=bool)
+        mask = np.zeros(len(xs), dtype=bool)
+        for poly in self.polygons:
+            mask |= shapely.contains_xy(poly, xs, ys)
+        return mask
+
+
+class ZoneIndex:
+    """
+    Process-wide LRU cache of CompiledZones per camera.
+    Entries are dropped by invalidate() whenever the zones API changes a camera's zones,
+    so the capture loop never has to re-query or re-compile zones after warm-up.
+    """
+    def __init__(self, max_cameras: int = MAX_CACHED_CAMERAS):
+        self.max_cameras = max_cameras
+        self._compiled: "OrderedDict[int, Tuple[int, CompiledZones]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, camera_id: int) -> Optional[CompiledZones]:
+        """
+        Returns the cached zones for a camera, or None on a miss.
+        """
+        with self._lock:
+            cached = self._compiled.get(camera_id)
+            if cached is None:
+                return None
+            self._compiled.move_to_end(camera_id)
+            return cached[1]
+
+    def put(self, camera_id: int, zone_points_list: list) -> CompiledZones:
+        compiled = CompiledZones(zone_points_list)
+        with self._lock:
+            self._compiled[camera_id] = (zone_version(zone_points_list), compiled)
+            self._compiled.move_to_end(camera_id)
+            while len(self._compiled) > self.max_cameras:
+                self._compiled.popitem(last=False)
+        return compiled
+
+    def get(self, camera_id: int, zone_points_list: list) -> CompiledZones:
+        """
+        Returns compiled zones for raw point lists, recompiling only when the geometry changed.
+        """
+        version = zone_version(zone_points_list)
+        with self._lock:
+            cached = self._compiled.get(camera_id)
+            if cached and cached[0] == version:
+                self._compiled.move_to_end(camera_id)
+                return cached[1]
+        return self.put(camera_id, zone_points_list)
+
+    def invalidate(self, camera_id: int):
+        with self._lock:
+            self._compiled.pop(camera_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._compiled.clear()
+
+zone_index = ZoneIndex()
@@ -1,6 +1,8 @@
 import logging
 import os
+import threading
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
@@ -16,10 +18,22 @@ async def lifespan(app: FastAPI):
     logger.info("Starting up Multi-Camera People Counting System...")
     
     # Create DB Tables
-    from .database import engine, Base
+    from .database import engine, Base, ensure_columns, ensure_indexes
+    from . import models  # noqa: F401 (registers tables on Base)
     Base.metadata.create_all(bind=engine)
+    ensure_columns()
+    ensure_indexes()
     logger.info("Database initialized.")
     
+    # Image retention runs in the background (start-up size scan, then periodic pruning)
+    from .services.image_store import image_store
+    image_store.start()
+    
+    # Start inference workers and warm up the model in the background so the API serves immediately
+    from .inference.worker_pool import inference_pool
+    threading.Thread(target=inference_pool.warm_up, name="model-warmup", daemon=True).start()
+    logger.info("Model warm-up started in background.")
+    
     # Start Scheduler
     from .services.scheduler_service import scheduler_service
     scheduler_service.start()
@@ -28,6 +42,16 @@ async def lifespan(app: FastAPI):
     yield
     # Shutdown: Clean up resources
     logger.info("Shutting down...")
+    from .services.stream_pool import stream_pool
+    stream_pool.close_all()
+    from .services.image_writer import image_writer
+    image_writer.stop()
+    from .services.image_store import image_store
+    image_store.stop()
+    from .inference.worker_pool import inference_pool
+    inference_pool.shutdown()
+    from .services.job_service import job_service
+    job_service.shutdown()
 
 # Changed app title as per instruction
 app = FastAPI(title="ShadiHaal Analytics", version="1.0.0", lifespan=lifespan)
@@ -39,22 +63,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
 print("--- [DEBUG] Main: Importing API Routers... ---")
-from .api import cameras, zones, stats, system
+from .api import cameras, zones, stats, system, schedules, jobs
 app.include_router(cameras.router)
 app.include_router(zones.router)
+app.include_router(schedules.router)
 app.include_router(stats.router)
+app.include_router(jobs.router)
 print("--- [DEBUG] Main: Including System Router... ---")
 app.include_router(system.router)
 print("--- [DEBUG] Main: Routers Included. ---")
 
-@app.post("/debug/trigger")
-async def trigger_detection():
-    # Force run the scheduler cycle immediately
-    await scheduler_service.check_and_run_cycle(force=True)
-    return {"status": "triggered"}
+@app.post("/debug/trigger", status_code=202)
+def trigger_detection():
+    """
+    Queues a forced capture round and returns its job id right away; poll GET /jobs/{id}.
+    Triggers while a round is queued or running join that job.
+    """
+    from .services.job_service import job_service
+    job = job_service.trigger()
+    return {"status": job.status, "job_id": job.id}
 
 @app.get("/")
 def read_root():
@@ -63,3 +94,16 @@ def read_root():
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
+
+@app.get("/ready")
+def readiness_check():
+    """
+    Reports whether the detection model is loaded. /health only says the API is up.
+    """
+    from .inference.worker_pool import inference_pool
+    model = inference_pool.status()
+    ready = model["state"] == "ready"
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not_ready", "model": model}
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey, DateTime, JSON, Index, func
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
@@ -12,11 +12,26 @@ class Camera(Base):
     username = Column(String, nullable=True)
     password = Column(String, nullable=True)
     is_enabled = Column(Boolean, default=True)
+    schedule_id = Column(Integer, ForeignKey("capture_schedules.id"), nullable=True)  # None = default schedule
+    # Optional 3x3 homography from normalized image coordinates to the hall floor plan
+    homography = Column(JSON, nullable=True)
     
+    schedule = relationship("CaptureSchedule", back_populates="cameras")
     zones = relationship("Zone", back_populates="camera", cascade="all, delete-orphan")
     captures = relationship("CaptureResult", back_populates="camera")
     stats = relationship("CameraSessionStat", back_populates="camera")
 
+class CaptureSchedule(Base):
+    __tablename__ = "capture_schedules"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String)
+    gap_minutes = Column(Float, default=5)  # Minutes between rounds
+    rounds_per_session = Column(Integer, default=5)
+    jitter_seconds = Column(Float, default=0)  # Random delay added to each round to spread stream load
+
+    cameras = relationship("Camera", back_populates="schedule")
+
 class Zone(Base):
     __tablename__ = "zones"
 
@@ -34,10 +49,31 @@ class CaptureSession(Base):
     start_time = Column(DateTime, default=datetime.now)
     end_time = Column(DateTime, nullable=True)
     is_completed = Column(Boolean, default=False)
+    schedule_id = Column(Integer, ForeignKey("capture_schedules.id"), nullable=True)  # None = default schedule
     
     captures = relationship("CaptureResult", back_populates="session")
+    rounds = relationship("CaptureRound", back_populates="session")
     camera_stats = relationship("CameraSessionStat", back_populates="session")
     hall_stat = relationship("HallSessionStat", back_populates="session", uselist=False)
+    schedule = relationship("CaptureSchedule")
+
+class CaptureRound(Base):
+    __tablename__ = "capture_rounds"
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(Integer, ForeignKey("capture_sessions.id"))
+    round_number = Column(Integer)  # 1-based within the session
+    status = Column(String, default="running")  # running | completed | partial | failed
+    started_at = Column(DateTime, default=datetime.now)
+    completed_at = Column(DateTime, nullable=True)
+    camera_outcomes = Column(JSON)  # {camera_id: "ok" | error message}
+
+    session = relationship("CaptureSession", back_populates="rounds")
+
+    __table_args__ = (
+        # Latest round of a session is a single index lookup
+        Index("ix_capture_rounds_session_round", "session_id", "round_number"),
+    )
 
 class CaptureResult(Base):
     __tablename__ = "capture_results"
@@ -47,11 +83,22 @@ class CaptureResult(Base):
     camera_id = Column(Integer, ForeignKey("cameras.id"))
     image_path = Column(String)
     people_count = Column(Integer)
+    # True when the motion gate found the frame unchanged and the previous count was carried over
+    reused = Column(Boolean, default=False)
+    # people_count minus people another camera already counted (None without floor-plan dedup)
+    dedup_count = Column(Integer, nullable=True)
     captured_at = Column(DateTime, default=datetime.now)
     
     camera = relationship("Camera", back_populates="captures")
     session = relationship("CaptureSession", back_populates="captures")
 
+    __table_args__ = (
+        # Serves "latest result per camera in a session" lookups
+        Index("ix_capture_results_session_camera_time", "session_id", "camera_id", "captured_at"),
+        # Serves "latest images" listings, exports and image pruning by day
+        Index("ix_capture_results_captured_at", "captured_at"),
+    )
+
 class CameraSessionStat(Base):
     __tablename__ = "camera_session_stats"
 
@@ -68,7 +115,27 @@ class HallSessionStat(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(Integer, ForeignKey("capture_sessions.id"))
-    total_count = Column(Float) # Sum of averages
+    total_count = Column(Float) # Sum of averages over the session's cameras (one schedule, not the whole hall)
     recorded_at = Column(DateTime, default=datetime.now)
     
     session = relationship("CaptureSession", back_populates="hall_stat")
+
+class OccupancyRollup(Base):
+    __tablename__ = "occupancy_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    bucket = Column(String)  # "hour" or "day"
+    bucket_start = Column(DateTime)
+    camera_id = Column(Integer, ForeignKey("cameras.id"), nullable=True)  # None = whole hall
+    samples = Column(Integer, default=0)
+    total = Column(Float, default=0)  # Sum of counts, avg = total / samples
+    min_count = Column(Float, nullable=True)
+    max_count = Column(Float, nullable=True)
+    histogram = Column(JSON)  # {count: occurrences}, used for exact percentiles
+
+    __table_args__ = (
+        Index("ix_occupancy_rollups_bucket_camera_start", "bucket", "camera_id", "bucket_start"),
+        # One row per bucket; NULLs are distinct in a unique index, so the hall row (camera_id None) is keyed as 0
+        Index("ux_occupancy_rollups_bucket_start_camera", "bucket", "bucket_start",
+              func.coalesce(camera_id, 0), unique=True),
+    )
@@ -0,0 +1,46 @@
+import sys
+import os
+
+# Ensure backend can be imported
+sys.path.append(os.getcwd())
+
+from backend.database import SessionLocal
+from backend.inference.backends import BACKENDS, export_model
+from backend.inference.yolo_engine import check_parity
+from backend.services.image_store import latest_images
+
+def parity_check(backend: str, limit: int = 20):
+    print(f"=== PARITY CHECK: pytorch vs {backend} ===")
+
+    # Newest stored images from the capture_results index (the image store is sharded by day and camera)
+    db = SessionLocal()
+    try:
+        files = [img["image_path"] for img in latest_images(db, limit)]
+    finally:
+        db.close()
+    if not files:
+        print("No images to compare.")
+        return
+
+    print(f"Exporting/loading {backend} model...")
+    print(f"Model path: {export_model(backend)}")
+
+    frames = {f: f for f in files}
+    report = check_parity(frames, backend)
+
+    for f in files:
+        ref = report["reference_counts"][f]
+        got = report["backend_counts"][f]
+        flag = "" if f not in report["mismatches"] else "  <-- MISMATCH"
+        print(f" - {f}: pytorch={ref} {report['backend']}={got}{flag}")
+
+    print(f"Backend used: {report['backend']}")
+    print("PARITY OK" if report["ok"] else "!!! PARITY FAILED")
+    print("=== PARITY CHECK END ===")
+
+if __name__ == "__main__":
+    backend = sys.argv[1] if len(sys.argv) > 1 else "onnx"
+    if backend not in BACKENDS:
+        print(f"Unknown backend '{backend}'. Choose from: {', '.join(BACKENDS)}")
+        sys.exit(1)
+    parity_check(backend)
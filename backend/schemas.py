@@ -1,7 +1,9 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional
 from datetime import datetime
 
+from .inference.floor_plan import parse_homography
+
 # --- Shared ---
 class MessageResponse(BaseModel):
     message: str
@@ -13,9 +15,19 @@ class CameraBase(BaseModel):
     username: Optional[str] = None
     password: Optional[str] = None
     is_enabled: Optional[bool] = True
+    schedule_id: Optional[int] = None
+    homography: Optional[List[List[float]]] = None  # 3x3, image (0..1) -> floor plan
+
+def _check_homography(value):
+    # An empty matrix clears it, like null
+    if not value:
+        return None
+    if parse_homography(value) is None:
+        raise ValueError("homography must be a 3x3 matrix of finite numbers with a non-zero determinant")
+    return value
 
 class CameraCreate(CameraBase):
-    pass
+    _homography = field_validator("homography")(_check_homography)
 
 class CameraUpdate(BaseModel):
     name: Optional[str] = None
@@ -23,6 +35,10 @@ class CameraUpdate(BaseModel):
     username: Optional[str] = None
     password: Optional[str] = None
     is_enabled: Optional[bool] = None
+    schedule_id: Optional[int] = None
+    homography: Optional[List[List[float]]] = None
+
+    _homography = field_validator("homography")(_check_homography)
 
 class CameraOut(CameraBase):
     id: int
@@ -49,12 +65,36 @@ class ZoneOut(ZoneBase):
     class Config:
         from_attributes = True
 
+# --- Schedule Schemas ---
+class ScheduleBase(BaseModel):
+    name: str
+    gap_minutes: float = Field(5, gt=0)
+    rounds_per_session: int = Field(5, ge=1)
+    jitter_seconds: float = Field(0, ge=0)
+
+class ScheduleCreate(ScheduleBase):
+    pass
+
+class ScheduleUpdate(BaseModel):
+    name: Optional[str] = None
+    gap_minutes: Optional[float] = Field(None, gt=0)
+    rounds_per_session: Optional[int] = Field(None, ge=1)
+    jitter_seconds: Optional[float] = Field(None, ge=0)
+
+class ScheduleOut(ScheduleBase):
+    id: int
+
+    class Config:
+        from_attributes = True
+
 # --- Stats/History Schemas ---
 class CaptureResultOut(BaseModel):
     id: int
     camera_id: int
     image_path: str
     people_count: int
+    reused: Optional[bool] = False
+    dedup_count: Optional[int] = None
     captured_at: datetime
     
     class Config:
@@ -64,7 +104,21 @@ class SessionStatOut(BaseModel):
     session_id: int
     start_time: datetime
     end_time: Optional[datetime]
+    schedule_id: Optional[int] = None
+    schedule_name: Optional[str] = None
     total_hall_count: Optional[float]
     
     class Config:
         from_attributes = True
+
+class RollupOut(BaseModel):
+    bucket: str
+    bucket_start: datetime
+    camera_id: Optional[int]
+    samples: int
+    avg: float
+    min: float
+    max: float
+    p50: float
+    p90: float
+    p95: float
@@ -1,38 +1,117 @@
-import cv2
 import logging
-from typing import Optional
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Optional
+
+from .stream_pool import stream_pool
 
 logger = logging.getLogger(__name__)
 
+# Pool shared by all capture rounds. Threads are started on demand, so it grows to the
+# number of cameras captured at once, up to MAX_CAPTURE_WORKERS. A hung stream only ties up
+# one worker; each camera gets CAPTURE_TIMEOUT_SECONDS from when a worker picks it up.
+MAX_CAPTURE_WORKERS = int(os.getenv("MAX_CAPTURE_WORKERS", "64"))
+CAPTURE_TIMEOUT_SECONDS = 10
+
+# Burst mode: frames sampled per camera per round (1 = single snapshot) and the time they span
+BURST_FRAMES = int(os.getenv("BURST_FRAMES", "1"))
+BURST_SPAN_SECONDS = float(os.getenv("BURST_SPAN_SECONDS", "3"))
+
+_capture_pool = ThreadPoolExecutor(max_workers=MAX_CAPTURE_WORKERS, thread_name_prefix="capture")
+
 class CameraService:
     @staticmethod
     def capture_frame(rtsp_url: str) -> Optional[tuple]:
         """
-        Captures a single frame from the RTSP stream.
+        Returns the newest frame from the camera's pooled stream.
+        The first call for a camera opens the stream; later calls are near-instant.
         Returns (frame, error_message).
         """
         try:
-            # Handle numeric camera indices (e.g. "0", "1") for local webcams
-            source = rtsp_url
-            if str(rtsp_url).isdigit():
-                source = int(rtsp_url)
-
-            # Open video stream
-            cap = cv2.VideoCapture(source)
-            if not cap.isOpened():
-                return None, f"Failed to open stream: {rtsp_url}"
-            
-            ret, frame = cap.read()
-            cap.release()
-            
-            if not ret:
-                return None, "Failed to read frame"
-            
-            return frame, None
+            return stream_pool.read(rtsp_url)
         except Exception as e:
             logger.error(f"Error capturing frame from {rtsp_url}: {e}")
             return None, str(e)
 
     @staticmethod
-    def save_frame(frame, output_path: str):
-        cv2.imwrite(output_path, frame)
+    def capture_burst(rtsp_url: str, count: int = BURST_FRAMES, span_seconds: float = BURST_SPAN_SECONDS) -> tuple:
+        """
+        Returns ([frames, oldest first], error_message) sampled from the pooled stream.
+        """
+        try:
+            return stream_pool.read_burst(rtsp_url, count, span_seconds)
+        except Exception as e:
+            logger.error(f"Error capturing burst from {rtsp_url}: {e}")
+            return [], str(e)
+
+    @staticmethod
+    def capture_frames(sources: Dict[int, str], timeout: float = CAPTURE_TIMEOUT_SECONDS) -> Dict[int, tuple]:
+        """
+        Captures one frame from every source in parallel.
+        sources maps camera_id -> rtsp_url. Returns camera_id -> (frame, error_message).
+        Cameras that do not answer within `timeout` seconds are reported as errors,
+        so the round takes about as long as the slowest camera, not the sum of all.
+        """
+        return CameraService._gather(
+            {cam_id: (CameraService.capture_frame, url) for cam_id, url in sources.items()}, timeout
+        )
+
+    @staticmethod
+    def capture_bursts(sources: Dict[int, str], count: int = BURST_FRAMES, span_seconds: float = BURST_SPAN_SECONDS,
+                       timeout: float = CAPTURE_TIMEOUT_SECONDS) -> Dict[int, tuple]:
+        """
+        Burst version of capture_frames: every camera samples its frames at the same time.
+        Returns camera_id -> ([frames], error_message).
+        """
+        return CameraService._gather(
+            {cam_id: (CameraService.capture_burst, url, count, span_seconds) for cam_id, url in sources.items()},
+            timeout + span_seconds
+        )
+
+    @staticmethod
+    def _gather(calls: dict, timeout: float) -> Dict[int, tuple]:
+        """
+        Runs the calls on the capture pool. A camera's timeout runs from when a worker starts it,
+        so with more cameras than workers (e.g. cold streams opening) the later ones are not
+        cut short by the time the earlier ones took. A camera still queued after a full timeout
+        gives up, which bounds the round at twice the timeout.
+        """
+        begin = time.monotonic()
+        started = {}
+
+        def run(cam_id, fn, *args):
+            started[cam_id] = time.monotonic()
+            return fn(*args)
+
+        futures = {
+            cam_id: _capture_pool.submit(run, cam_id, *call)
+            for cam_id, call in calls.items()
+        }
+        pending = dict(futures)
+        while pending:
+            now = time.monotonic()
+            deadlines = {cam_id: started.get(cam_id, begin) + timeout for cam_id in pending}
+            for cam_id, deadline in deadlines.items():
+                if deadline <= now:
+                    del pending[cam_id]
+            if not pending:
+                break
+            done, _ = wait(pending.values(), timeout=min(deadlines[c] for c in pending) - now,
+                           return_when=FIRST_COMPLETED)
+            pending = {cam_id: f for cam_id, f in pending.items() if f not in done}
+
+        results = {}
+        for cam_id, future in futures.items():
+            if not future.done():
+                future.cancel()
+                if cam_id in started:
+                    results[cam_id] = (None, f"Capture timed out after {timeout}s")
+                else:
+                    results[cam_id] = (None, f"No capture worker free within {timeout}s")
+                continue
+            try:
+                results[cam_id] = future.result()
+            except Exception as e:
+                results[cam_id] = (None, str(e))
+        return results
@@ -0,0 +1,57 @@
+import asyncio
+import json
+import logging
+import threading
+from typing import List, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+logger = logging.getLogger(__name__)
+
+# Per-subscriber backlog. A client that falls this far behind starts losing events.
+MAX_PENDING_EVENTS = 100
+
+
+class EventBus:
+    """
+    Fan-out of server events to streaming clients.
+    publish() is called from scheduler/request threads; each subscriber is an
+    asyncio.Queue drained by a /stats/stream response on the event loop.
+    """
+    def __init__(self):
+        self._subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=MAX_PENDING_EVENTS)
+        with self._lock:
+            self._subscribers.append((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers = [(l, q) for l, q in self._subscribers if q is not queue]
+
+    def publish(self, event: str, data: dict):
+        message = format_sse(event, data)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, message)
+            except RuntimeError:
+                # Loop already closed; the stream's finally block will unsubscribe
+                pass
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, message: str):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            logger.warning("Event stream client is too slow, dropping event")
+
+
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+event_bus = EventBus()
@@ -0,0 +1,172 @@
+import csv
+import io
+import logging
+from datetime import datetime
+from typing import Iterator, Optional
+
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models import CaptureSession, HallSessionStat, CameraSessionStat, Camera, CaptureResult
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_FETCH_SIZE = 1000
+# Rows per Parquet row group (each group is flushed to the client as it is written)
+PARQUET_ROW_GROUP_SIZE = 10000
+
+SESSION_COLUMNS = ["Session ID", "Start Time", "End Time", "Total Hall Count", "Camera Name", "Camera Average"]
+CAPTURE_COLUMNS = ["Capture ID", "Session ID", "Camera ID", "Camera Name", "Captured At", "People Count", "Image Path"]
+
+
+def _fmt(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def session_rows(db: Session, start: Optional[datetime], end: Optional[datetime]) -> Iterator[list]:
+    """
+    One row per (completed session, camera) from a single joined, streamed query.
+    Sessions without camera stats get one "N/A" row, as before.
+    """
+    query = db.query(
+        CaptureSession.id, CaptureSession.start_time, CaptureSession.end_time,
+        HallSessionStat.total_count, CameraSessionStat.camera_id, Camera.name,
+        CameraSessionStat.average_count
+    ).outerjoin(HallSessionStat, HallSessionStat.session_id == CaptureSession.id)\
+     .outerjoin(CameraSessionStat, CameraSessionStat.session_id == CaptureSession.id)\
+     .outerjoin(Camera, Camera.id == CameraSessionStat.camera_id)\
+     .filter(CaptureSession.is_completed == True)
+    if start:
+        query = query.filter(CaptureSession.start_time >= start)
+    if end:
+        query = query.filter(CaptureSession.start_time < end)
+    query = query.order_by(CaptureSession.start_time.desc(), CaptureSession.id.desc())
+
+    for sid, start_time, end_time, total, cam_id, cam_name, avg in \
+            query.execution_options(stream_results=True).yield_per(EXPORT_FETCH_SIZE):
+        total = total if total is not None else 0
+        if cam_id is None:
+            # Entry without camera details
+            yield [sid, start_time, end_time, total, "N/A", "N/A"]
+        else:
+            yield [sid, start_time, end_time, total, cam_name or f"Cam {cam_id}", avg]
+
+
+def capture_rows(db: Session, start: Optional[datetime], end: Optional[datetime]) -> Iterator[list]:
+    """
+    Raw per-capture rows (CaptureResult) from a single joined, streamed query.
+    """
+    query = db.query(
+        CaptureResult.id, CaptureResult.session_id, CaptureResult.camera_id, Camera.name,
+        CaptureResult.captured_at, CaptureResult.people_count, CaptureResult.image_path
+    ).outerjoin(Camera, Camera.id == CaptureResult.camera_id)
+    if start:
+        query = query.filter(CaptureResult.captured_at >= start)
+    if end:
+        query = query.filter(CaptureResult.captured_at < end)
+    query = query.order_by(CaptureResult.captured_at.desc(), CaptureResult.id.desc())
+
+    for cid, sid, cam_id, cam_name, captured_at, count, path in \
+            query.execution_options(stream_results=True).yield_per(EXPORT_FETCH_SIZE):
+        yield [cid, sid, cam_id, cam_name or f"Cam {cam_id}", captured_at, count, path]
+
+
+def _rows(granularity: str, start, end):
+    """
+    Opens its own DB session: the response body is streamed after the request's
+    dependencies have already been closed.
+    """
+    db = SessionLocal()
+    try:
+        if granularity == "capture":
+            yield from capture_rows(db, start, end)
+        else:
+            yield from session_rows(db, start, end)
+    finally:
+        db.close()
+
+
+def stream_csv(granularity: str, start=None, end=None) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CAPTURE_COLUMNS if granularity == "capture" else SESSION_COLUMNS)
+
+    for i, row in enumerate(_rows(granularity, start, end), 1):
+        writer.writerow([_fmt(v) if isinstance(v, datetime) else v for v in row])
+        if i % EXPORT_FETCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file object that hands written bytes back to the generator instead of holding the file.
+    """
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_parquet(granularity: str, start=None, end=None) -> Iterator[bytes]:
+    """
+    Streams a Parquet file, one row group at a time. Requires pyarrow.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if granularity == "capture":
+        schema = pa.schema([
+            ("capture_id", pa.int64()), ("session_id", pa.int64()), ("camera_id", pa.int64()),
+            ("camera_name", pa.string()), ("captured_at", pa.timestamp("us")),
+            ("people_count", pa.int64()), ("image_path", pa.string()),
+        ])
+    else:
+        schema = pa.schema([
+            ("session_id", pa.int64()), ("start_time", pa.timestamp("us")), ("end_time", pa.timestamp("us")),
+            ("total_hall_count", pa.float64()), ("camera_name", pa.string()),
+            ("camera_average", pa.float64()),
+        ])
+
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+
+    def flush(batch):
+        columns = list(zip(*batch))
+        if granularity != "capture":
+            # "N/A" placeholders from the CSV layout become nulls
+            columns[5] = [None if v == "N/A" else v for v in columns[5]]
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(col, type=field.type) for col, field in zip(columns, schema)],
+            schema=schema
+        ))
+
+    batch = []
+    for row in _rows(granularity, start, end):
+        batch.append(row)
+        if len(batch) >= PARQUET_ROW_GROUP_SIZE:
+            flush(batch)
+            batch = []
+            yield sink.drain()
+    if batch:
+        flush(batch)
+    writer.close()
+    yield sink.drain()
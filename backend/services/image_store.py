@@ -0,0 +1,252 @@
+import logging
+import os
+import shutil
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import cv2
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models import CaptureResult
+
+logger = logging.getLogger(__name__)
+
+IMAGE_DIR = os.getenv("IMAGE_DIR", "images")
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+# Downscale saved images to this width (0 keeps the full resolution)
+IMAGE_MAX_WIDTH = int(os.getenv("IMAGE_MAX_WIDTH", "0"))
+# Day directories older than this are deleted (0 keeps images forever)
+IMAGE_RETENTION_DAYS = int(os.getenv("IMAGE_RETENTION_DAYS", "30"))
+# Oldest days are deleted while the store is larger than this (0 = no size cap)
+IMAGE_MAX_TOTAL_MB = int(os.getenv("IMAGE_MAX_TOTAL_MB", "0"))
+IMAGE_PRUNE_INTERVAL_SECONDS = 3600
+# latest_images() scans at most this many pages of results for files that exist
+LATEST_IMAGES_MAX_PAGES = 5
+
+DAY_FORMAT = "%Y-%m-%d"
+
+
+class _Day:
+    def __init__(self):
+        self.bytes = 0
+        self.files = 0
+        # Files from before sharding that live directly in IMAGE_DIR
+        self.legacy_paths = []
+
+
+class ImageStore:
+    """
+    Capture images sharded as IMAGE_DIR/<YYYY-MM-DD>/cam_<id>/<file>.jpg.
+    Sizes are tracked per day in memory (one scan at start-up, then updated on every
+    write), so retention deletes whole day directories without walking them file by file.
+    Listing the latest images goes through the capture_results table (see latest_images),
+    never through the directory.
+    """
+    def __init__(self, root: str = IMAGE_DIR):
+        self.root = root
+        self.quality = IMAGE_JPEG_QUALITY
+        self.max_width = IMAGE_MAX_WIDTH
+        self.retention_days = IMAGE_RETENTION_DAYS
+        self.max_total_bytes = IMAGE_MAX_TOTAL_MB * 1024 * 1024
+        self.pruned_files = 0
+        self.pruned_bytes = 0
+        self.last_prune: Optional[datetime] = None
+        self._days: Dict[str, _Day] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        os.makedirs(self.root, exist_ok=True)
+
+    def path_for(self, camera_id: int, session_id: int, captured_at: datetime) -> str:
+        # Millisecond resolution: rounds less than a second apart must not overwrite each other
+        return os.path.join(
+            self.root, captured_at.strftime(DAY_FORMAT), f"cam_{camera_id}",
+            f"sess_{session_id}_{captured_at.strftime('%H%M%S')}_{captured_at.microsecond // 1000:03d}.jpg"
+        )
+
+    def encode(self, frame) -> bytes:
+        h, w = frame.shape[:2]
+        if self.max_width and w > self.max_width:
+            frame = cv2.resize(frame, (self.max_width, int(h * self.max_width / w)), interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        return buf.tobytes()
+
+    def write(self, frame, path: str):
+        """
+        Encodes and stores a frame at a path from path_for(). Runs on the image writer thread.
+        """
+        data = self.encode(frame)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        day = os.path.relpath(path, self.root).split(os.sep)[0]
+        with self._lock:
+            entry = self._days.setdefault(day, _Day())
+            entry.bytes += len(data)
+            entry.files += 1
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="image-pruner", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        self._scan()
+        while not self._stop.is_set():
+            try:
+                self.prune()
+            except Exception as e:
+                logger.error(f"Image pruning failed: {e}")
+            self._stop.wait(IMAGE_PRUNE_INTERVAL_SECONDS)
+
+    def _scan(self):
+        """
+        One-time size count of what is already on disk. Pre-sharding files in the root
+        are bucketed by modification date so retention covers them too.
+        """
+        days: Dict[str, _Day] = {}
+        for entry in os.scandir(self.root):
+            if entry.is_dir():
+                day = days.setdefault(entry.name, _Day())
+                for dirpath, _, filenames in os.walk(entry.path):
+                    for name in filenames:
+                        try:
+                            day.bytes += os.path.getsize(os.path.join(dirpath, name))
+                            day.files += 1
+                        except OSError:
+                            pass
+            elif entry.is_file():
+                stat = entry.stat()
+                day = days.setdefault(datetime.fromtimestamp(stat.st_mtime).strftime(DAY_FORMAT), _Day())
+                day.bytes += stat.st_size
+                day.files += 1
+                day.legacy_paths.append(entry.path)
+
+        with self._lock:
+            # Images written while the scan ran may be off by a few; totals only drive the size cap
+            self._days = days
+        logger.info(f"Image store: {sum(d.files for d in days.values())} files in {len(days)} days")
+
+    def prune(self, now: datetime = None):
+        """
+        Deletes days past the retention period, then the oldest days while over the size cap.
+        Today is never deleted by the size cap.
+        """
+        now = now or datetime.now()
+        today = now.strftime(DAY_FORMAT)
+        with self._lock:
+            days = sorted(self._days)
+            total = sum(d.bytes for d in self._days.values())
+
+        expired = []
+        if self.retention_days:
+            cutoff = (now - timedelta(days=self.retention_days)).strftime(DAY_FORMAT)
+            expired = [d for d in days if d < cutoff]
+        for day in expired:
+            total -= self._delete_day(day)
+
+        if self.max_total_bytes:
+            for day in days:
+                if total <= self.max_total_bytes or day >= today:
+                    break
+                if day in expired:
+                    continue
+                total -= self._delete_day(day)
+
+        self.last_prune = now
+
+    def _delete_day(self, day: str) -> int:
+        with self._lock:
+            entry = self._days.pop(day, None)
+        if entry is None:
+            return 0
+
+        path = os.path.join(self.root, day)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        for legacy in entry.legacy_paths:
+            try:
+                os.remove(legacy)
+            except OSError:
+                pass
+        self._forget_paths(day)
+
+        self.pruned_files += entry.files
+        self.pruned_bytes += entry.bytes
+        logger.info(f"Pruned images of {day}: {entry.files} files, {entry.bytes / 1024 / 1024:.1f} MB")
+        return entry.bytes
+
+    def _forget_paths(self, day: str):
+        """
+        Clears image_path on that day's capture results so they don't point at deleted files.
+        """
+        try:
+            start = datetime.strptime(day, DAY_FORMAT)
+        except ValueError:
+            return
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(CaptureResult)
+                .where(CaptureResult.captured_at >= start,
+                       CaptureResult.captured_at < start + timedelta(days=1),
+                       CaptureResult.image_path != "")
+                .values(image_path="")
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            days = {day: {"files": d.files, "bytes": d.bytes} for day, d in sorted(self._days.items())}
+        return {
+            "root": self.root,
+            "jpeg_quality": self.quality,
+            "max_width": self.max_width,
+            "retention_days": self.retention_days,
+            "max_total_bytes": self.max_total_bytes,
+            "total_files": sum(d["files"] for d in days.values()),
+            "total_bytes": sum(d["bytes"] for d in days.values()),
+            "days": days,
+            "pruned_files": self.pruned_files,
+            "pruned_bytes": self.pruned_bytes,
+            "last_prune": self.last_prune,
+        }
+
+
+def latest_images(db: Session, limit: int = 10, camera_id: Optional[int] = None) -> list:
+    """
+    Newest stored images, newest first, from the capture_results index.
+    A result's image_path is recorded when its frame is queued, before the background writer
+    has saved it (or if the write fails), so rows whose file is not on disk are skipped.
+    """
+    query = db.query(CaptureResult.camera_id, CaptureResult.session_id, CaptureResult.captured_at, CaptureResult.image_path)\
+              .filter(CaptureResult.image_path != "", CaptureResult.image_path.isnot(None))
+    if camera_id is not None:
+        query = query.filter(CaptureResult.camera_id == camera_id)
+    query = query.order_by(CaptureResult.captured_at.desc(), CaptureResult.id.desc())
+
+    images = []
+    # Missing files are rare (pending or failed writes), so a few pages cover them
+    page = max(limit, 50)
+    for offset in range(0, page * LATEST_IMAGES_MAX_PAGES, page):
+        rows = query.offset(offset).limit(page).all()
+        for cam_id, sid, captured_at, path in rows:
+            if os.path.exists(path):
+                images.append({"camera_id": cam_id, "session_id": sid, "captured_at": captured_at, "image_path": path})
+                if len(images) == limit:
+                    return images
+        if len(rows) < page:
+            break
+    return images
+
+image_store = ImageStore()
@@ -0,0 +1,62 @@
+import logging
+import os
+import queue
+import threading
+
+from .image_store import image_store
+
+logger = logging.getLogger(__name__)
+
+# Persisting capture images is optional; counting never waits on it
+SAVE_CAPTURE_IMAGES = os.getenv("SAVE_CAPTURE_IMAGES", "1") == "1"
+# Frames waiting to be encoded. When full, new frames are dropped rather than blocking a round.
+MAX_PENDING_WRITES = 64
+
+
+class ImageWriter:
+    """
+    Background JPEG writer. Capture rounds hand frames over with submit()
+    and carry on; encoding and disk I/O (through the image store) happen on a single worker thread.
+    """
+    def __init__(self):
+        self.enabled = SAVE_CAPTURE_IMAGES
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=MAX_PENDING_WRITES)
+        self._thread = threading.Thread(target=self._run, name="image-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, frame, output_path: str) -> bool:
+        """
+        Queues a frame for writing. Returns False if saving is disabled or the queue is full.
+        """
+        if not self.enabled:
+            return False
+        try:
+            self._queue.put_nowait((frame, output_path))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"Image writer queue full, dropping {output_path}")
+            return False
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                frame, output_path = item
+                image_store.write(frame, output_path)
+            except Exception as e:
+                logger.error(f"Failed to write image: {e}")
+            finally:
+                self._queue.task_done()
+
+    def stop(self):
+        """
+        Flushes pending writes and stops the worker.
+        """
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+
+image_writer = ImageWriter()
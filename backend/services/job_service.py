@@ -0,0 +1,106 @@
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs kept for GET /jobs/{id}
+MAX_FINISHED_JOBS = 100
+
+
+class CaptureJob:
+    """
+    One manually triggered capture cycle and its per-camera progress.
+    """
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = "queued"  # queued | running | completed | failed
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.error: Optional[str] = None
+        self.triggers = 1  # how many requests were coalesced into this job
+        self.cameras = {}  # camera_id -> {"state": ..., "people_count": ..., "error": ...}
+        self._lock = threading.Lock()
+
+    def update_camera(self, camera_id: int, state: str, people_count: int = None, error: str = None):
+        """
+        Called from the capture round: pending -> captured | failed -> counted.
+        """
+        with self._lock:
+            entry = self.cameras.setdefault(camera_id, {})
+            entry["state"] = state
+            if people_count is not None:
+                entry["people_count"] = people_count
+            if error is not None:
+                entry["error"] = error
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            cameras = {cam_id: dict(entry) for cam_id, entry in self.cameras.items()}
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "triggers": self.triggers,
+            "cameras": cameras,
+        }
+
+
+class JobService:
+    """
+    Runs triggered capture cycles on a single background worker so request
+    handlers (and the event loop) never execute capture or inference work.
+    A trigger while a job is queued or running joins that job instead of starting another.
+    """
+    def __init__(self):
+        self.jobs: "OrderedDict[str, CaptureJob]" = OrderedDict()
+        self._current: Optional[CaptureJob] = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="capture-job")
+
+    def trigger(self) -> CaptureJob:
+        with self._lock:
+            if self._current is not None:
+                self._current.triggers += 1
+                return self._current
+            job = CaptureJob()
+            self._current = job
+            self.jobs[job.id] = job
+            while len(self.jobs) > MAX_FINISHED_JOBS:
+                self.jobs.popitem(last=False)
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[CaptureJob]:
+        return self.jobs.get(job_id)
+
+    def _run(self, job: CaptureJob):
+        from .scheduler_service import scheduler_service
+        job.status = "running"
+        job.started_at = datetime.now()
+        try:
+            scheduler_service.check_and_run_cycle(force=True, job=job)
+            # Group errors are recorded on the job rather than raised
+            job.status = "failed" if job.error else "completed"
+        except Exception as e:
+            logger.error(f"Capture job {job.id} failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now()
+            with self._lock:
+                if self._current is job:
+                    self._current = None
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+job_service = JobService()
@@ -0,0 +1,171 @@
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..models import OccupancyRollup
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = ("hour", "day")
+# Rows per INSERT / keys per locking SELECT in a flush. SQLite caps bind parameters
+# per statement (999 before 3.32) and an insert row takes 8 of them.
+FLUSH_BATCH_SIZE = 100
+
+
+def bucket_start(ts: datetime, bucket: str) -> datetime:
+    if bucket == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def percentile(histogram: dict, q: float) -> float:
+    """
+    Nearest-rank percentile of an integer-count histogram ({count: occurrences}).
+    """
+    if not histogram:
+        return 0
+    points = sorted((float(k), n) for k, n in histogram.items())
+    rank = q * sum(n for _, n in points)
+    seen = 0
+    for value, n in points:
+        seen += n
+        if seen >= rank:
+            return value
+    return points[-1][0]
+
+
+class _Bucket:
+    def __init__(self):
+        self.samples = 0
+        self.total = 0.0
+        self.min_count = None
+        self.max_count = None
+        self.histogram = defaultdict(int)
+
+    def add(self, value: float):
+        self.samples += 1
+        self.total += value
+        self.min_count = value if self.min_count is None else min(self.min_count, value)
+        self.max_count = value if self.max_count is None else max(self.max_count, value)
+        self.histogram[str(int(round(value)))] += 1
+
+
+def _insert(db: Session):
+    """
+    Dialect INSERT that supports ON CONFLICT.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(OccupancyRollup)
+    return sqlite.insert(OccupancyRollup)
+
+
+class RollupAccumulator:
+    """
+    Collects per-camera and hall-wide samples in memory and merges them into
+    occupancy_rollups with one insert, one locking read and one write per flush.
+    """
+    def __init__(self):
+        self._buckets: Dict[Tuple[str, datetime, Optional[int]], _Bucket] = defaultdict(_Bucket)
+
+    def add_round(self, captured_at: datetime, counts: dict, hall_total: float = None):
+        """
+        counts maps camera_id -> people count for one capture round.
+        The round's sum (or hall_total, when cameras overlap) is one sample of the
+        hall-wide (camera_id None) series.
+        """
+        if not counts:
+            return
+        if hall_total is None:
+            hall_total = sum(counts.values())
+        for bucket in BUCKETS:
+            start = bucket_start(captured_at, bucket)
+            for cam_id, count in counts.items():
+                self._buckets[(bucket, start, cam_id)].add(count)
+            self._buckets[(bucket, start, None)].add(hall_total)
+
+    def flush(self, db: Session):
+        """
+        Merges the accumulated samples into the rollup table. Does not commit,
+        so it lands in the same transaction as the capture results.
+
+        Several schedules flush into the same buckets at once. Missing rows are
+        created with INSERT .. ON CONFLICT DO NOTHING against the unique bucket index,
+        then the rows are read FOR UPDATE (in id order, so writers don't deadlock)
+        and merged, so concurrent flushes neither duplicate nor overwrite a bucket.
+        Both steps run in batches of FLUSH_BATCH_SIZE.
+        """
+        if not self._buckets:
+            return
+
+        keys = sorted(self._buckets.keys(), key=lambda k: (k[0], k[1], k[2] is not None, k[2] or 0))
+        # Statements are batched so a large flush (e.g. the backfill) stays under the bind-parameter limit
+        for i in range(0, len(keys), FLUSH_BATCH_SIZE):
+            db.execute(_insert(db).values([
+                {"bucket": b, "bucket_start": start, "camera_id": cam_id, "samples": 0, "total": 0.0,
+                 "min_count": None, "max_count": None, "histogram": {}}
+                for b, start, cam_id in keys[i:i + FLUSH_BATCH_SIZE]
+            ]).on_conflict_do_nothing())
+
+        existing = {}
+        for bucket in BUCKETS:
+            starts = sorted({k[1] for k in keys if k[0] == bucket})
+            for i in range(0, len(starts), FLUSH_BATCH_SIZE):
+                rows = db.query(OccupancyRollup).filter(
+                    OccupancyRollup.bucket == bucket,
+                    OccupancyRollup.bucket_start.in_(starts[i:i + FLUSH_BATCH_SIZE])
+                ).order_by(OccupancyRollup.id).with_for_update().all()
+                for row in rows:
+                    existing[(row.bucket, row.bucket_start, row.camera_id)] = row
+
+        for key, acc in self._buckets.items():
+            row = existing[key]
+            row.samples += acc.samples
+            row.total += acc.total
+            row.min_count = acc.min_count if row.min_count is None else min(row.min_count, acc.min_count)
+            row.max_count = acc.max_count if row.max_count is None else max(row.max_count, acc.max_count)
+            histogram = dict(row.histogram or {})
+            for value, n in acc.histogram.items():
+                histogram[value] = histogram.get(value, 0) + n
+            # Reassign so the JSON column is flagged as changed
+            row.histogram = histogram
+
+        self._buckets.clear()
+
+
+def record_round(db: Session, captured_at: datetime, counts: dict, hall_total: float = None):
+    acc = RollupAccumulator()
+    acc.add_round(captured_at, counts, hall_total)
+    acc.flush(db)
+
+
+def query_rollups(db: Session, bucket: str, start: Optional[datetime], end: Optional[datetime],
+                  camera_id: Optional[int] = None) -> list:
+    query = db.query(OccupancyRollup).filter(OccupancyRollup.bucket == bucket)
+    if camera_id is None:
+        query = query.filter(OccupancyRollup.camera_id.is_(None))
+    else:
+        query = query.filter(OccupancyRollup.camera_id == camera_id)
+    if start:
+        query = query.filter(OccupancyRollup.bucket_start >= bucket_start(start, bucket))
+    if end:
+        query = query.filter(OccupancyRollup.bucket_start < end)
+
+    return [
+        {
+            "bucket": r.bucket,
+            "bucket_start": r.bucket_start,
+            "camera_id": r.camera_id,
+            "samples": r.samples,
+            "avg": r.total / r.samples if r.samples else 0,
+            "min": r.min_count or 0,
+            "max": r.max_count or 0,
+            "p50": percentile(r.histogram, 0.50),
+            "p90": percentile(r.histogram, 0.90),
+            "p95": percentile(r.histogram, 0.95),
+        }
+        for r in query.order_by(OccupancyRollup.bucket_start).all()
+    ]
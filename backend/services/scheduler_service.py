@@ -1,13 +1,24 @@
 import logging
 from apscheduler.schedulers.background import BackgroundScheduler
+from sqlalchemy import func, insert
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
-import os
+import random
+import threading
 
 from ..database import SessionLocal
-from ..models import Camera, CaptureSession, CaptureResult, CameraSessionStat, HallSessionStat
-from .camera_service import CameraService
-from ..inference.yolo_engine import inference_engine
+from ..models import Camera, Zone, CaptureSchedule, CaptureSession, CaptureRound, CaptureResult, CameraSessionStat, HallSessionStat
+from .camera_service import CameraService, BURST_FRAMES
+from .image_writer import image_writer
+from .image_store import image_store
+from .event_bus import event_bus
+from .stats_service import latest_session_total, live_total, schedule_label
+from .rollup_service import record_round
+from .stream_pool import stream_pool
+from ..inference.worker_pool import inference_pool
+from ..inference.motion_gate import motion_gate
+from ..inference.floor_plan import dedup_counts, floor_dedup
+from ..inference.zone_index import zone_index
 
 logger = logging.getLogger(__name__)
 
@@ -22,189 +33,526 @@ logging.basicConfig(
     ]
 )
 
-IMAGE_DIR = "images"
-if not os.path.exists(IMAGE_DIR):
-    os.makedirs(IMAGE_DIR)
+# Defaults for cameras without a CaptureSchedule: minutes between rounds, rounds per session
+GAP_MINUTES = 5
+ROUNDS_PER_SESSION = 5
+JITTER_SECONDS = 0
+
+
+class ScheduleGroup:
+    """
+    Cameras that share one capture schedule. key is the CaptureSchedule id, or None for the default group.
+    """
+    def __init__(self, key=None, name="Default", gap_minutes=GAP_MINUTES,
+                 rounds_per_session=ROUNDS_PER_SESSION, jitter_seconds=JITTER_SECONDS):
+        self.key = key
+        self.name = name
+        self.gap = timedelta(minutes=gap_minutes)
+        self.rounds_per_session = rounds_per_session
+        self.jitter_seconds = jitter_seconds
+
+    @property
+    def job_id(self) -> str:
+        return f"schedule-{self.key or 'default'}"
+
+    def camera_filter(self):
+        if self.key is None:
+            return Camera.schedule_id.is_(None)
+        return Camera.schedule_id == self.key
+
+    def session_filter(self):
+        if self.key is None:
+            return CaptureSession.schedule_id.is_(None)
+        return CaptureSession.schedule_id == self.key
+
+
+class _RoundFollowers:
+    """
+    Stands in for a CaptureJob during a timer round: capture jobs triggered while the
+    round runs join it and receive its per-camera progress from then on.
+    """
+    def __init__(self):
+        self.done = threading.Event()
+        self._jobs = []
+        self._lock = threading.Lock()
+
+    def join(self, job):
+        if job is not None:
+            with self._lock:
+                self._jobs.append(job)
+
+    def _snapshot(self) -> list:
+        with self._lock:
+            return list(self._jobs)
+
+    def update_camera(self, *args, **kwargs):
+        for job in self._snapshot():
+            job.update_camera(*args, **kwargs)
+
+    @property
+    def error(self):
+        return None
+
+    @error.setter
+    def error(self, value):
+        for job in self._snapshot():
+            job.error = value
+
 
 print("--- [DEBUG] SchedulerService: Importing... ---")
 class SchedulerService:
+    """
+    Timer-driven dispatch: every schedule group has one one-shot job set for its next round.
+    After a round the next one is timed from that round's start (plus jitter), so there is
+    no periodic database polling, and a per-group lock keeps a slow round from overlapping the next.
+    """
     def __init__(self):
         print("--- [DEBUG] SchedulerService: Initializing Instance... ---")
         self.scheduler = BackgroundScheduler()
         self.is_paused = False
-        # Schedule job but DO NOT start scheduler yet
-        self.scheduler.add_job(self.check_and_run_cycle, 'interval', minutes=1, next_run_time=datetime.now())
+        self.groups = {}
+        self.metrics = {}
+        self._locks = {}
+        # key -> _RoundFollowers of the timer round that group is running right now
+        self._timer_rounds = {}
+        # Held while a group lock is taken or released together with its _timer_rounds entry,
+        # so a trigger never sees a timer round's lock held without its followers
+        self._rounds_guard = threading.Lock()
+        self._groups_lock = threading.Lock()
         
     def start(self):
         if not self.scheduler.running:
             self.scheduler.start()
             logger.info("Scheduler started.")
+        self.reload_schedules()
     
     def pause(self):
         logger.info("System Paused")
         self.is_paused = True
+        event_bus.publish("status", {"is_paused": True})
         
     def resume(self):
         logger.info("System Resumed")
         self.is_paused = False
+        event_bus.publish("status", {"is_paused": False})
+        self.reload_schedules()
 
-    def check_and_run_cycle(self, force: bool = False):
+    def reload_schedules(self):
         """
-        Runs every minute.
-        Checks if we need to start a session or perform a capture within an active session.
-        If force=True, ignores time gaps.
+        Re-reads schedule groups and re-times each group's next round.
+        Called at start-up and whenever schedules or camera assignments change.
         """
-        if self.is_paused and not force:
+        db = SessionLocal()
+        try:
+            groups = {None: ScheduleGroup()}
+            for sched in db.query(CaptureSchedule).all():
+                groups[sched.id] = ScheduleGroup(sched.id, sched.name, sched.gap_minutes,
+                                                 sched.rounds_per_session, sched.jitter_seconds)
+            
+            # One gap after the start of each group's latest round, whether its session is still
+            # active or already finished; only a group that never ran starts right away
+            next_runs = {}
+            now = datetime.now()
+            for key, group in groups.items():
+                latest = db.query(CaptureSession).filter(group.session_filter())\
+                           .order_by(CaptureSession.is_completed, CaptureSession.id.desc()).first()
+                last = self.last_round(db, latest.id) if latest else None
+                if last is not None:
+                    last_start = last.started_at
+                elif latest is not None:
+                    last_start = latest.end_time or latest.start_time
+                else:
+                    last_start = None
+                next_runs[key] = max(now, last_start + group.gap) if last_start else now
+
+            # Scheduled cameras' streams must survive the gap between rounds
+            stream_pool.keep_open(url for url, in db.query(Camera.rtsp_url).filter(Camera.is_enabled == True))
+        finally:
+            db.close()
+        
+        with self._groups_lock:
+            removed = set(self.groups) - set(groups)
+            for key in removed:
+                job = self.scheduler.get_job(self.groups[key].job_id)
+                if job:
+                    job.remove()
+            self.groups = groups
+            for key in groups:
+                self._locks.setdefault(key, threading.Lock())
+                self.metrics.setdefault(key, {
+                    "rounds_dispatched": 0, "overlaps_skipped": 0, "last_scheduled_for": None,
+                    "last_started_at": None, "last_lag_seconds": None, "max_lag_seconds": 0.0,
+                    "total_lag_seconds": 0.0,
+                })
+        
+        for key, run_at in next_runs.items():
+            self.schedule_next(key, run_at)
+
+    def schedule_next(self, key, run_at: datetime):
+        group = self.groups.get(key)
+        if group is None:
+            return
+        if group.jitter_seconds:
+            run_at += timedelta(seconds=random.uniform(0, group.jitter_seconds))
+        self.scheduler.add_job(
+            self._dispatch, 'date', run_date=run_at, args=[key, run_at],
+            id=group.job_id, replace_existing=True, misfire_grace_time=None, coalesce=True
+        )
+
+    def _dispatch(self, key, scheduled_for: datetime):
+        group = self.groups.get(key)
+        if group is None:
+            return
+        
+        if self.is_paused:
             print(f"[{datetime.now().strftime('%H:%M:%S')}] SCHEDULER PAUSED (Skipping)")
+            return  # resume() re-times every group
+        
+        lock = self._locks[key]
+        with self._rounds_guard:
+            acquired = lock.acquire(blocking=False)
+            if acquired:
+                followers = _RoundFollowers()
+                self._timer_rounds[key] = followers
+        if not acquired:
+            # Previous round of this group is still running; it schedules the next one itself
+            self.metrics[key]["overlaps_skipped"] += 1
+            logger.warning(f"Schedule '{group.name}': previous round still running, skipping")
             return
+        
+        started = datetime.now()
+        m = self.metrics[key]
+        lag = max(0.0, (started - scheduled_for).total_seconds())
+        m["rounds_dispatched"] += 1
+        m["last_scheduled_for"] = scheduled_for
+        m["last_started_at"] = started
+        m["last_lag_seconds"] = lag
+        m["max_lag_seconds"] = max(m["max_lag_seconds"], lag)
+        m["total_lag_seconds"] += lag
+        try:
+            self.run_group(group, job=followers)
+        finally:
+            with self._rounds_guard:
+                self._timer_rounds.pop(key, None)
+                lock.release()
+            followers.done.set()
+            # Timed from this round's start, never earlier than now: slow rounds don't stack
+            self.schedule_next(key, max(started + group.gap, datetime.now()))
 
+    def schedule_metrics(self) -> list:
+        out = []
+        for key, group in list(self.groups.items()):
+            m = self.metrics.get(key, {})
+            job = self.scheduler.get_job(group.job_id)
+            dispatched = m.get("rounds_dispatched", 0)
+            out.append({
+                "schedule_id": key,
+                "name": group.name,
+                "gap_minutes": group.gap.total_seconds() / 60,
+                "rounds_per_session": group.rounds_per_session,
+                "jitter_seconds": group.jitter_seconds,
+                "next_run_at": job.next_run_time if job else None,
+                "running": self._locks[key].locked() if key in self._locks else False,
+                "rounds_dispatched": dispatched,
+                "overlaps_skipped": m.get("overlaps_skipped", 0),
+                "last_scheduled_for": m.get("last_scheduled_for"),
+                "last_started_at": m.get("last_started_at"),
+                "last_lag_seconds": m.get("last_lag_seconds"),
+                "max_lag_seconds": m.get("max_lag_seconds", 0.0),
+                "avg_lag_seconds": m.get("total_lag_seconds", 0.0) / dispatched if dispatched else None,
+            })
+        return out
+
+    def check_and_run_cycle(self, force: bool = False, job=None):
+        """
+        Runs every schedule group once, now.
+        Checks if we need to start a session or perform a capture within an active session.
+        If force=True, ignores time gaps. job (a CaptureJob) receives per-camera progress.
+        A group whose timer round is already running is not run again right after it:
+        the job follows that round instead.
+        """
+        if not self.groups:
+            self.reload_schedules()
+        for key, group in list(self.groups.items()):
+            lock = self._locks[key]
+            with self._rounds_guard:
+                acquired = lock.acquire(blocking=False)
+                followers = None if acquired else self._timer_rounds.get(key)
+                if followers is not None:
+                    followers.join(job)
+            if followers is not None:
+                followers.done.wait()
+                continue
+            if not acquired:
+                # Held by another forced run, not a timer round
+                lock.acquire()
+            try:
+                self.run_group(group, force, job)
+            finally:
+                lock.release()
+        if self.scheduler.running:
+            self.reload_schedules()
+
+    def run_group(self, group: ScheduleGroup, force: bool = False, job=None):
+        """
+        Starts a session or performs the next round for one schedule group.
+        """
         db = SessionLocal()
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] SCHEDULER TICK CHECK") # Visible heartbeat
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] SCHEDULER TICK '{group.name}'") # Visible heartbeat
         try:
             # 1. Check for active session
-            active_session = db.query(CaptureSession).filter(CaptureSession.is_completed == False).first()
+            active_session = db.query(CaptureSession).filter(CaptureSession.is_completed == False, group.session_filter()).first()
             
             if not active_session:
-                # No active session. Should we start one?
-                # For demo, let's start one if none exists (Continuous loops with gaps?)
-                # Or maybe every 30 minutes?
-                # Let's enforce a rule: Start new session if last one finished > 5 mins ago? 
-                # Simplest: Start immediately if none active (Continuous Measurement).
+                # No active session: start one right away (Continuous Measurement).
                 
                 # Check if we have any cameras
-                cameras = db.query(Camera).filter(Camera.is_enabled == True).all()
-                if not cameras:
-                    logger.info("No enabled cameras. Skipping session start.")
+                has_cameras = db.query(Camera.id).filter(Camera.is_enabled == True, group.camera_filter()).first()
+                if not has_cameras:
+                    logger.info(f"No enabled cameras in schedule '{group.name}'. Skipping session start.")
                     return
 
-                logger.info("Starting new Capture Session")
-                new_session = CaptureSession(start_time=datetime.now())
+                logger.info(f"Starting new Capture Session ({group.name})")
+                new_session = CaptureSession(start_time=datetime.now(), schedule_id=group.key)
                 db.add(new_session)
+                # Short transaction of its own: keeping it open through capture and inference
+                # would hold the SQLite write lock and stall every other writer
                 db.commit()
-                db.refresh(new_session)
+                self.publish_session(new_session, None)
                 
-                self.perform_capture(db, new_session)
+                self.perform_capture(db, new_session, 1, group, job)
                 
             else:
-                # Active session exists. Check if it's time for next capture.
-                last_capture = db.query(CaptureResult).filter(CaptureResult.session_id == active_session.id)\
-                                 .order_by(CaptureResult.captured_at.desc()).first()
+                # Active session exists. Check if it's time for next round.
+                last_round = self.last_round(db, active_session.id)
                 
-                if not last_capture:
-                    # Should not happen if created correctly, but recover
-                    self.perform_capture(db, active_session)
-                else:
-                    # Check gap
-                    time_since_last = datetime.now() - last_capture.captured_at
-                    # Requirement: 5 minute gap.
-                    # Use 1 minute for DEBUGGING speed, change to 5 for production.
-                    GAP_MINUTES = 5 
-                    
-                    if force or time_since_last >= timedelta(minutes=GAP_MINUTES):
-                        # check how many we have
-                        count = db.query(CaptureResult).filter(CaptureResult.session_id == active_session.id).count()
-                        # Each camera produces 1 result per capture event. 
-                        # We need to count "events". Distinct timestamps?
-                        # Since we capture all cameras at once, dividing by num_cameras gives events?
-                        # Safe way: Count distinct timestamps or just track "rounds".
-                        
-                        # Let's count totals and divide by camera count, or just assume we do 5 rounds.
-                        cameras = db.query(Camera).filter(Camera.is_enabled == True).all()
-                        num_cameras = len(cameras)
-                        if num_cameras == 0:
-                             active_session.is_completed = True
-                             db.commit()
-                             return
-
-                        current_images = db.query(CaptureResult).filter(CaptureResult.session_id == active_session.id).count()
-                        rounds_done = current_images // num_cameras
-                        
-                        if rounds_done >= 5:
-                            # We are done. Finalize.
-                            self.finalize_session(db, active_session)
-                        else:
-                            self.perform_capture(db, active_session)
+                if not last_round:
+                    # Session without rounds (e.g. its first round failed or was interrupted): recover
+                    self.perform_capture(db, active_session, 1, group, job)
+                elif last_round.round_number >= group.rounds_per_session:
+                    # All rounds ran but finalization didn't happen (e.g. crash). Finish it now.
+                    self.finalize_session(db, active_session)
+                # Timers may fire a moment early; a second of slack avoids skipping a whole gap
+                elif force or datetime.now() - last_round.started_at >= group.gap - timedelta(seconds=1):
+                    self.perform_capture(db, active_session, last_round.round_number + 1, group, job)
                             
         except Exception as e:
             logger.error(f"Scheduler Error: {e}")
             print(f"!!! SCHEDULER ERROR: {e}")
             import traceback
             traceback.print_exc()
+            if job is not None:
+                job.error = f"{group.name}: {e}"
         finally:
             db.close()
 
-    def perform_capture(self, db: Session, session: CaptureSession):
-        logger.info(f"Performing capture for Session {session.id}")
-        cameras = db.query(Camera).filter(Camera.is_enabled == True).all()
+    def last_round(self, db: Session, session_id: int):
+        return db.query(CaptureRound).filter(CaptureRound.session_id == session_id)\
+                 .order_by(CaptureRound.round_number.desc()).first()
+
+    def perform_capture(self, db: Session, session: CaptureSession, round_number: int = 1,
+                        group: ScheduleGroup = None, job=None):
+        group = group or ScheduleGroup()
+        logger.info(f"Performing capture round {round_number} for Session {session.id}")
+        cameras = db.query(Camera).filter(Camera.is_enabled == True, group.camera_filter()).all()
+        
+        capture_round = CaptureRound(session_id=session.id, round_number=round_number, started_at=datetime.now())
+        db.add(capture_round)
+        if job is not None:
+            for cam in cameras:
+                job.update_camera(cam.id, "pending")
         
+        # Grab all frames first so the round is a near-simultaneous snapshot.
+        # In burst mode each camera yields several frames that are reduced to one robust count.
+        sources = {cam.id: cam.rtsp_url for cam in cameras}
+        burst = BURST_FRAMES > 1
+        if burst:
+            frames = CameraService.capture_bursts(sources)
+        else:
+            frames = CameraService.capture_frames(sources)
+        
+        # Count straight from the in-memory frames; saving images happens off the critical path
+        captured = {}
+        outcomes = {}
         for cam in cameras:
-            # Capture Frame
-            frame, err = CameraService.capture_frame(cam.rtsp_url)
+            frame, err = frames[cam.id]
             if err:
                 logger.error(f"Failed to capture cam {cam.id}: {err}")
-                continue # Skip or record error
-            
-            # Save Image
-            filename = f"sess_{session.id}_cam_{cam.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
-            filepath = os.path.join(IMAGE_DIR, filename)
-            CameraService.save_frame(frame, filepath)
-            
-            # Run Inference
-            # Get zones
-            zones = [z.points for z in cam.zones]
-            count = inference_engine.detect_people(filepath, zones)
+                outcomes[str(cam.id)] = err
+                if job is not None:
+                    job.update_camera(cam.id, "failed", error=err)
+                continue # Failed cameras don't block the round
+            captured[cam.id] = frame
+            outcomes[str(cam.id)] = "ok"
+            if job is not None:
+                job.update_camera(cam.id, "captured")
+        
+        # Run Inference
+        zones = self.load_zones(db, list(captured.keys()))
+        # Cameras mapped onto the hall floor plan are deduplicated against each other, which needs their detections
+        homographies = {cam.id: cam.homography for cam in cameras if cam.homography and cam.id in captured}
+        detections = {} if len(homographies) > 1 else None
+        # Cameras whose picture hasn't changed keep their previous count and skip the model
+        to_infer, reused = motion_gate.split(captured)
+        failed = set()
+        if burst:
+            counts = inference_pool.detect_people_burst(to_infer, zones, detections_out=detections, failed_out=failed)
+            # The newest frame of each burst is the one saved
+            captured = {cam_id: burst_frames[-1] for cam_id, burst_frames in captured.items()}
+        else:
+            counts = inference_pool.detect_people_batch(to_infer, zones, detections, failed_out=failed)
+        # A failed camera's 0 must not become the reference that later rounds reuse
+        motion_gate.update(counts, failed)
+        for cam_id in failed:
+            outcomes[str(cam_id)] = "inference failed"
+        counts.update(reused)
+        duplicates = {}
+        if detections is not None:
+            shapes = {cam_id: frame.shape for cam_id, frame in captured.items()}
+            duplicates = floor_dedup.dedup(homographies, detections, shapes)
+        deduped = dedup_counts(counts, duplicates)
+        
+        session_id = session.id
+        captured_at = datetime.now()
+        results = []
+        for cam_id, frame in captured.items():
+            # Queue Image for the background writer
+            filepath = image_store.path_for(cam_id, session_id, captured_at)
+            if not image_writer.submit(frame, filepath):
+                filepath = ""
             
-            # Save Result
-            result = CaptureResult(
-                session_id=session.id,
-                camera_id=cam.id,
-                image_path=filepath,
-                people_count=count,
-                captured_at=datetime.now()
-            )
-            db.add(result)
+            results.append({
+                "session_id": session_id,
+                "camera_id": cam_id,
+                "image_path": filepath,
+                "people_count": counts.get(cam_id, 0),
+                "reused": cam_id in reused,
+                "dedup_count": deduped.get(cam_id),
+                "captured_at": captured_at,
+            })
+        
+        # One bulk INSERT for the whole round
+        if results:
+            db.execute(insert(CaptureResult), results)
+        
+        # Hourly/daily occupancy rollups, in the same transaction as the results.
+        # Other schedules' cameras keep their latest counts, so the hall sample is the live total, not this group's sum
+        hall_total, _ = live_total(db)
+        record_round(db, captured_at, {r["camera_id"]: r["people_count"] for r in results}, float(hall_total))
+        
+        # A round counts even if some (or all) cameras failed, so sessions always finish
+        capture_round.camera_outcomes = outcomes
+        capture_round.completed_at = datetime.now()
+        if not cameras or not captured:
+            capture_round.status = "failed"
+        elif len(captured) < len(cameras):
+            capture_round.status = "partial"
+        else:
+            capture_round.status = "completed"
+        
+        # Last round of the session finalizes in this same transaction
+        total_hall_count = None
+        if round_number >= group.rounds_per_session:
+            total_hall_count = self.finalize_session(db, session, commit=False)
         
         db.commit()
+        if job is not None:
+            for r in results:
+                job.update_camera(r["camera_id"], "counted", people_count=r["people_count"])
+        self.publish_capture(db, session_id, results)
+        if total_hall_count is not None:
+            self.publish_session(session, total_hall_count)
+
+    def publish_capture(self, db: Session, session_id: int, results: list):
+        """
+        Pushes a committed round to /stats/stream clients.
+        """
+        live_count, last_updated = live_total(db)
+        session_total, _ = latest_session_total(db, session_id)
+        event_bus.publish("capture", {
+            "session_id": session_id,
+            "session_total": session_total,
+            "results": [
+                {"camera_id": r["camera_id"], "people_count": r["people_count"], "reused": r["reused"],
+                 "dedup_count": r["dedup_count"], "captured_at": r["captured_at"]}
+                for r in results
+            ],
+            "live_count": live_count,
+            "last_updated": last_updated,
+        })
+
+    def publish_session(self, session: CaptureSession, total_hall_count):
+        event_bus.publish("session", {
+            "session_id": session.id,
+            "start_time": session.start_time,
+            "end_time": session.end_time,
+            "schedule_id": session.schedule_id,
+            "schedule_name": schedule_label(session),
+            "total_hall_count": total_hall_count,
+            "is_completed": session.is_completed,
+        })
+
+    def load_zones(self, db: Session, camera_ids: list) -> dict:
+        """
+        Returns camera_id -> CompiledZones from the process-wide zone cache.
+        Cache misses are filled with a single query; warm rounds touch no zone rows at all.
+        """
+        zones = {}
+        missing = []
+        for cam_id in camera_ids:
+            compiled = zone_index.lookup(cam_id)
+            if compiled is None:
+                missing.append(cam_id)
+            else:
+                zones[cam_id] = compiled
+        
+        if missing:
+            points = {cam_id: [] for cam_id in missing}
+            rows = db.query(Zone.camera_id, Zone.points).filter(Zone.camera_id.in_(missing)).all()
+            for cam_id, pts in rows:
+                points[cam_id].append(pts)
+            for cam_id, pts in points.items():
+                zones[cam_id] = zone_index.put(cam_id, pts)
         
-        # Check if this was the 5th round
-        total_captures = db.query(CaptureResult).filter(CaptureResult.session_id == session.id).count()
-        num_cameras = len(cameras)
-        if total_captures >= 5 * num_cameras:
-             self.finalize_session(db, session)
+        return zones
 
-    def finalize_session(self, db: Session, session: CaptureSession):
+    def finalize_session(self, db: Session, session: CaptureSession, commit: bool = True) -> float:
+        """
+        Writes per-camera averages and the hall total for a session.
+        Averages come from one GROUP BY query and are bulk-inserted. The hall total
+        adds up deduplicated counts, so people seen by two overlapping cameras count once.
+        It covers the cameras of the session's schedule only; with several schedules
+        each session's total is one schedule's share of the hall.
+        With commit=False the caller commits (used to finalize within the last round's transaction).
+        Returns the hall total.
+        """
         logger.info(f"Finalizing Session {session.id}")
         session.end_time = datetime.now()
         session.is_completed = True
         
         # Compute Stats
-        cameras = db.query(Camera).all()
-        total_hall_count = 0
+        averages = db.query(
+            CaptureResult.camera_id,
+            func.avg(CaptureResult.people_count),
+            func.avg(func.coalesce(CaptureResult.dedup_count, CaptureResult.people_count))
+        ).filter(CaptureResult.session_id == session.id)\
+         .group_by(CaptureResult.camera_id).all()
         
-        for cam in cameras:
-            results = db.query(CaptureResult).filter(
-                CaptureResult.session_id == session.id,
-                CaptureResult.camera_id == cam.id
-            ).all()
-            
-            if not results:
-                continue
-                
-            avg = sum([r.people_count for r in results]) / len(results)
-            
-            stat = CameraSessionStat(
-                session_id=session.id,
-                camera_id=cam.id,
-                average_count=avg
-            )
-            db.add(stat)
-            total_hall_count += avg
+        if averages:
+            db.execute(insert(CameraSessionStat), [
+                {"session_id": session.id, "camera_id": cam_id, "average_count": float(avg)}
+                for cam_id, avg, _ in averages
+            ])
+        total_hall_count = sum(float(unique_avg) for _, _, unique_avg in averages)
             
         hall_stat = HallSessionStat(
             session_id=session.id,
             total_count=total_hall_count
         )
         db.add(hall_stat)
-        db.commit()
+        if commit:
+            db.commit()
+            self.publish_session(session, total_hall_count)
+        return total_hall_count
 
 scheduler_service = SchedulerService()
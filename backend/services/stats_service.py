@@ -0,0 +1,51 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..models import Camera, CaptureSession, CaptureResult
+
+
+def latest_session_total(db: Session, session_id):
+    """
+    Sum of the latest count of every enabled camera in a session, in a single query.
+    Counts deduplicated across overlapping cameras (dedup_count) are used where present.
+    session_id may also be a list of ids or a subquery of ids (several schedules run sessions side by side).
+    Returns (total, last_updated).
+    """
+    if isinstance(session_id, int):
+        session_filter = CaptureResult.session_id == session_id
+    else:
+        session_filter = CaptureResult.session_id.in_(session_id)
+
+    latest = db.query(
+        CaptureResult.camera_id,
+        func.coalesce(CaptureResult.dedup_count, CaptureResult.people_count).label("people_count"),
+        CaptureResult.captured_at,
+        func.row_number().over(
+            partition_by=CaptureResult.camera_id,
+            order_by=CaptureResult.captured_at.desc()
+        ).label("rn")
+    ).filter(session_filter).subquery()
+
+    total, last_updated = db.query(
+        func.coalesce(func.sum(latest.c.people_count), 0),
+        func.max(latest.c.captured_at)
+    ).join(Camera, Camera.id == latest.c.camera_id)\
+     .filter(latest.c.rn == 1, Camera.is_enabled == True).one()
+    return total, last_updated
+
+
+def schedule_label(session: CaptureSession) -> str:
+    """
+    Name of the schedule a session belongs to, so per-session totals are not read as hall totals.
+    """
+    if session.schedule is not None:
+        return session.schedule.name
+    return "Default" if session.schedule_id is None else f"Schedule {session.schedule_id}"
+
+
+def live_total(db: Session):
+    """
+    Latest hall total across all active sessions. Returns (total, last_updated).
+    """
+    active = db.query(CaptureSession.id).filter(CaptureSession.is_completed == False)
+    return latest_session_total(db, active.scalar_subquery())
@@ -0,0 +1,190 @@
+import cv2
+import logging
+import threading
+import time
+from typing import Dict, Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Streams that nobody has read from for this long are closed by the reaper.
+# Only applies to streams opened for previews or disabled cameras; scheduled cameras stay open (see keep_open)
+IDLE_TIMEOUT_SECONDS = 300
+# How long a first read waits for a freshly opened stream to deliver a frame
+FIRST_FRAME_TIMEOUT_SECONDS = 8
+# Frames older than this are treated as a dead stream
+MAX_FRAME_AGE_SECONDS = 10
+RECONNECT_BACKOFF_MIN = 1
+RECONNECT_BACKOFF_MAX = 30
+
+
+def _open_source(rtsp_url: str):
+    # Handle numeric camera indices (e.g. "0", "1") for local webcams
+    source = rtsp_url
+    if str(rtsp_url).isdigit():
+        source = int(rtsp_url)
+    cap = cv2.VideoCapture(source)
+    # Keep the driver-side buffer small so reads are close to live
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
+
+
+class CameraStream:
+    """
+    One long-lived capture with a grabber thread that always holds the newest decoded frame.
+    Reconnects with exponential backoff when the stream drops.
+    """
+    def __init__(self, rtsp_url: str):
+        self.rtsp_url = rtsp_url
+        self.last_access = time.monotonic()
+        self.last_error: Optional[str] = None
+
+        self._frame = None
+        self._frame_time = 0.0
+        self._lock = threading.Lock()
+        self._has_frame = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"grabber-{rtsp_url}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        backoff = RECONNECT_BACKOFF_MIN
+        while not self._stop.is_set():
+            cap = _open_source(self.rtsp_url)
+            if not cap.isOpened():
+                cap.release()
+                self.last_error = f"Failed to open stream: {self.rtsp_url}"
+                logger.warning(f"{self.last_error} (retrying in {backoff}s)")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, RECONNECT_BACKOFF_MAX)
+                continue
+
+            logger.info(f"Stream connected: {self.rtsp_url}")
+            try:
+                while not self._stop.is_set():
+                    ret, frame = cap.read()
+                    if not ret:
+                        self.last_error = "Failed to read frame"
+                        break
+                    with self._lock:
+                        self._frame = frame
+                        self._frame_time = time.monotonic()
+                    self.last_error = None
+                    self._has_frame.set()
+                    backoff = RECONNECT_BACKOFF_MIN
+            finally:
+                cap.release()
+
+            if not self._stop.is_set():
+                logger.warning(f"Stream dropped: {self.rtsp_url} (reconnecting in {backoff}s)")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, RECONNECT_BACKOFF_MAX)
+
+    def read(self, timeout: float = FIRST_FRAME_TIMEOUT_SECONDS) -> tuple:
+        """
+        Returns (frame, error_message) for the newest decoded frame.
+        Only blocks when the stream has not produced its first frame yet.
+        """
+        self.last_access = time.monotonic()
+        if not self._has_frame.wait(timeout):
+            return None, self.last_error or f"No frame received within {timeout}s"
+
+        with self._lock:
+            frame, frame_time = self._frame, self._frame_time
+
+        if time.monotonic() - frame_time > MAX_FRAME_AGE_SECONDS:
+            return None, self.last_error or "Stream stalled"
+        # Copy so callers can draw on / hold the frame while the grabber keeps writing
+        return frame.copy(), None
+
+    def read_burst(self, count: int, span_seconds: float) -> tuple:
+        """
+        Samples up to `count` distinct frames spread evenly over `span_seconds`.
+        Returns ([frames, oldest first], error_message); a stream that repeats
+        the same frame just yields fewer frames.
+        """
+        frame, err = self.read()
+        if err:
+            return [], err
+        with self._lock:
+            last_time = self._frame_time
+        frames = [frame]
+
+        interval = span_seconds / max(1, count - 1)
+        for _ in range(count - 1):
+            if self._stop.wait(interval):
+                break
+            with self._lock:
+                frame, frame_time = self._frame, self._frame_time
+            if frame_time == last_time:
+                continue
+            last_time = frame_time
+            frames.append(frame.copy())
+        self.last_access = time.monotonic()
+        return frames, None
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
+
+
+class StreamPool:
+    """
+    Keeps one CameraStream per source URL and closes streams that go idle.
+    Streams of enabled cameras are exempt: schedule gaps can be longer than the
+    idle timeout, and reopening an RTSP stream every round is what the pool avoids.
+    """
+    def __init__(self):
+        self.streams: Dict[str, CameraStream] = {}
+        self._pinned: Set[str] = set()
+        self._lock = threading.Lock()
+        self._reaper = threading.Thread(target=self._reap_idle, name="stream-reaper", daemon=True)
+        self._reaper.start()
+
+    def get_stream(self, rtsp_url: str) -> CameraStream:
+        with self._lock:
+            stream = self.streams.get(rtsp_url)
+            if stream is None:
+                stream = CameraStream(rtsp_url)
+                self.streams[rtsp_url] = stream
+            return stream
+
+    def read(self, rtsp_url: str) -> tuple:
+        return self.get_stream(rtsp_url).read()
+
+    def read_burst(self, rtsp_url: str, count: int, span_seconds: float) -> tuple:
+        return self.get_stream(rtsp_url).read_burst(count, span_seconds)
+
+    def keep_open(self, rtsp_urls: Iterable[str]):
+        """
+        Sets the URLs the reaper never closes (the enabled cameras' streams).
+        """
+        with self._lock:
+            self._pinned = set(rtsp_urls)
+
+    def release(self, rtsp_url: str):
+        with self._lock:
+            stream = self.streams.pop(rtsp_url, None)
+        if stream:
+            stream.close()
+
+    def _reap_idle(self):
+        while True:
+            time.sleep(IDLE_TIMEOUT_SECONDS / 5)
+            now = time.monotonic()
+            with self._lock:
+                idle = [
+                    url for url, s in self.streams.items()
+                    if url not in self._pinned and now - s.last_access > IDLE_TIMEOUT_SECONDS
+                ]
+            for url in idle:
+                logger.info(f"Closing idle stream: {url}")
+                self.release(url)
+
+    def close_all(self):
+        with self._lock:
+            streams = list(self.streams.values())
+            self.streams.clear()
+        for stream in streams:
+            stream.close()
+
+stream_pool = StreamPool()
@@ -0,0 +1,55 @@
+import os
+import sys
+
+import numpy as np
+
+# Ensure backend can be imported
+sys.path.append(os.getcwd())
+
+from backend.inference.floor_plan import FloorPlanDedup, dedup_counts
+from backend.inference.tracker import burst_counts, count_detections
+
+SHAPE = (100, 100, 3)
+# Both cameras see the same floor area: normalized image coordinates are floor metres
+HOMOGRAPHIES = {1: np.eye(3).tolist(), 2: np.eye(3).tolist()}
+
+
+def _person(x: float, in_zone: bool = True):
+    return ((x - 5, 40, x + 5, 60), in_zone)
+
+
+def test_burst_dedup_matches_count():
+    """
+    Camera 2 sees one person on most burst frames but three on its newest frame,
+    all of whom camera 1 also sees. Deduplicating against the newest frame would
+    subtract three duplicates from a count of one.
+    """
+    shared = [_person(20), _person(50), _person(80)]
+    bursts = {1: [object()] * 3, 2: [object()] * 3}
+    detections = {
+        (1, 0): shared, (1, 1): shared, (1, 2): shared,
+        (2, 0): shared[:1], (2, 1): shared[:1], (2, 2): shared,
+    }
+    counts = {key: sum(1 for _, in_zone in dets if in_zone) for key, dets in detections.items()}
+
+    for method in ("median", "track"):
+        burst = burst_counts(bursts, counts, detections, method)
+        assert burst == {1: 3, 2: 1}, (method, burst)
+
+        frames = count_detections(bursts, detections, burst)
+        assert frames[2] == shared[:1]
+
+        duplicates = FloorPlanDedup().dedup(HOMOGRAPHIES, frames, {1: SHAPE, 2: SHAPE})
+        assert duplicates == {1: 0, 2: 1}, (method, duplicates)
+        assert dedup_counts(burst, duplicates) == {1: 3, 2: 0}
+
+
+def test_dedup_never_exceeds_count():
+    assert dedup_counts({1: 1, 2: 4}, {1: 3, 2: 1}) == {1: 0, 2: 3}
+    assert dedup_counts({}, {5: 2}) == {5: 0}
+
+
+if __name__ == "__main__":
+    test_burst_dedup_matches_count()
+    test_dedup_never_exceeds_count()
+    print("OK")
@@ -0,0 +1,93 @@
+import os
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+
+# Ensure backend can be imported
+sys.path.append(os.getcwd())
+
+from backend.database import Base
+from backend.models import CaptureResult, CaptureSession, OccupancyRollup
+from backend.backfill_rollups import backfill
+from backend.services.rollup_service import RollupAccumulator
+
+DAYS = 60
+CAMERAS = 30
+# SQLite's default bind-parameter limit before 3.32; builds differ, so tests pin it
+SQLITE_MAX_VARIABLES = 999
+
+
+def _engine(tmp: str):
+    engine = create_engine(f"sqlite:///{os.path.join(tmp, 'rollups.db')}")
+
+    @event.listens_for(engine, "connect")
+    def _limit_variables(dbapi_connection, connection_record):
+        dbapi_connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, SQLITE_MAX_VARIABLES)
+
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def test_backfill_many_buckets():
+    """
+    Backfills 60 days x 30 cameras of hourly rounds into SQLite. That is far more
+    rollup rows than SQLite's bind-parameter limit allows in one statement.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = _engine(tmp)
+        factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        db = factory()
+        session = CaptureSession(start_time=datetime(2026, 1, 1))
+        db.add(session)
+        db.commit()
+        start = datetime(2026, 1, 1)
+        for day in range(DAYS):
+            rows = [
+                {"session_id": session.id, "camera_id": cam_id, "image_path": "",
+                 "people_count": cam_id % 5, "captured_at": start + timedelta(days=day, hours=hour)}
+                for hour in range(24) for cam_id in range(1, CAMERAS + 1)
+            ]
+            db.execute(insert(CaptureResult), rows)
+        db.commit()
+
+        backfill(factory)
+
+        hours = DAYS * 24
+        assert db.query(OccupancyRollup).filter_by(bucket="hour").count() == hours * (CAMERAS + 1)
+        assert db.query(OccupancyRollup).filter_by(bucket="day").count() == DAYS * (CAMERAS + 1)
+        hall = db.query(OccupancyRollup).filter_by(bucket="day", camera_id=None).first()
+        assert hall.samples == 24
+        assert hall.total == 24 * sum(cam_id % 5 for cam_id in range(1, CAMERAS + 1))
+        db.close()
+        engine.dispose()
+
+
+def test_flush_beyond_variable_limit():
+    """
+    One flush of ~6500 buckets: unbatched, its INSERT would need ~52000 bind parameters.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = _engine(tmp)
+        db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+        acc = RollupAccumulator()
+        start = datetime(2026, 1, 1)
+        for hour in range(200):
+            acc.add_round(start + timedelta(hours=hour), {cam_id: 1 for cam_id in range(1, CAMERAS + 1)})
+        acc.flush(db)
+        db.commit()
+
+        assert db.query(OccupancyRollup).filter_by(bucket="hour").count() == 200 * (CAMERAS + 1)
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    test_backfill_many_buckets()
+    test_flush_beyond_variable_limit()
+    print("OK")
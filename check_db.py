@@ -1,6 +1,5 @@
 from backend.database import SessionLocal
 from backend.models import CaptureResult, CaptureSession, Camera
-from backend.services.scheduler_service import scheduler_service
 import time
 
 def check_db():
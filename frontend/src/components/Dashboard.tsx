@@ -1,5 +1,5 @@
 import { useEffect, useState } from 'react';
-import { getCameras, getHistory } from '../services/api';
+import { getCameras, openStatsStream } from '../services/api';
 import type { Camera } from '../services/api';
 
 export default function Dashboard() {
@@ -11,23 +11,28 @@ export default function Dashboard() {
 
     useEffect(() => {
         loadData();
-        fetchSystemStatus();
+        // Preview stills still refresh on a timer; counts arrive over the event stream
         const interval = setInterval(() => {
             setRefreshKey(Date.now());
-            loadData(); // Also refresh stats
         }, 5000); // 5 seconds refresh
         return () => clearInterval(interval);
     }, []);
 
-    const fetchSystemStatus = async () => {
-        try {
-            const res = await fetch('http://localhost:8000/system/status');
-            const data = await res.json();
-            setIsPaused(data.is_paused);
-        } catch (e) {
-            console.error("Failed to fetch system status", e);
-        }
-    };
+    useEffect(() => {
+        const stream = openStatsStream();
+        const applyLive = (e: MessageEvent) => {
+            const data = JSON.parse(e.data);
+            setLastCount(data.live_count);
+            if (data.last_updated) setLastUpdated(data.last_updated);
+        };
+        stream.addEventListener('snapshot', (e) => {
+            applyLive(e as MessageEvent);
+            setIsPaused(JSON.parse((e as MessageEvent).data).is_paused);
+        });
+        stream.addEventListener('capture', (e) => applyLive(e as MessageEvent));
+        stream.addEventListener('status', (e) => setIsPaused(JSON.parse((e as MessageEvent).data).is_paused));
+        return () => stream.close();
+    }, []);
 
     const toggleSystemPause = async () => {
         const endpoint = isPaused ? 'resume' : 'pause';
@@ -56,23 +61,6 @@ export default function Dashboard() {
         try {
             const cams = await getCameras();
             setCameras(cams);
-
-            // Get latest history for stats
-            const history = await getHistory();
-
-            // Also fetch live stats (new endpoint)
-            try {
-                // We need to add this to api.ts service first, but for now specific fetch:
-                const res = await fetch('http://localhost:8000/stats/live');
-                const liveData = await res.json();
-                setLastCount(liveData.live_count);
-                if (liveData.last_updated) setLastUpdated(liveData.last_updated);
-            } catch (e) {
-                // Fallback to history if live fails
-                if (history.length > 0) {
-                    setLastCount(history[0].total_hall_count);
-                }
-            }
         } catch (e) {
             console.error("Failed to load dashboard", e);
         }
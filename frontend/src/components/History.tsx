@@ -1,31 +1,73 @@
 import { useEffect, useState } from 'react';
-import { getHistory, exportCsv } from '../services/api';
+import { getHistoryPage, exportCsv, openStatsStream } from '../services/api';
 
 interface SessionStat {
     session_id: number;
     start_time: string;
     end_time: string | null;
+    schedule_name: string;
     total_hall_count: number;
 }
 
 export default function History() {
     const [history, setHistory] = useState<SessionStat[]>([]);
+    const [nextCursor, setNextCursor] = useState<number | null>(null);
 
     useEffect(() => {
         loadHistory();
-        const interval = setInterval(loadHistory, 3000); // Refresh every 3 seconds
-        return () => clearInterval(interval);
+
+        // Sessions change only when the scheduler starts/finishes one or commits a round
+        const stream = openStatsStream();
+        // Every (re)connect starts with a snapshot; after a reconnect, events from the gap are lost, so reload
+        let connectedBefore = false;
+        stream.addEventListener('snapshot', () => {
+            if (connectedBefore) loadHistory();
+            connectedBefore = true;
+        });
+        stream.addEventListener('session', (e) => {
+            const s = JSON.parse((e as MessageEvent).data);
+            const row: SessionStat = {
+                session_id: s.session_id,
+                start_time: s.start_time,
+                end_time: s.end_time,
+                schedule_name: s.schedule_name,
+                total_hall_count: s.total_hall_count ?? 0,
+            };
+            setHistory(prev => prev.some(h => h.session_id === row.session_id)
+                ? prev.map(h => h.session_id === row.session_id ? row : h)
+                : [row, ...prev]);
+        });
+        stream.addEventListener('capture', (e) => {
+            const c = JSON.parse((e as MessageEvent).data);
+            // live_count is the whole hall; a session row only shows its own schedule's cameras
+            setHistory(prev => prev.map(h => h.session_id === c.session_id && !h.end_time
+                ? { ...h, total_hall_count: c.session_total }
+                : h));
+        });
+        return () => stream.close();
     }, []);
 
     const loadHistory = async () => {
         try {
-            const data = await getHistory();
-            setHistory(data);
+            const page = await getHistoryPage();
+            setHistory(page.items);
+            setNextCursor(page.nextCursor);
         } catch (e) {
             console.error("Failed to load history", e);
         }
     };
 
+    const loadMore = async () => {
+        if (nextCursor === null) return;
+        try {
+            const page = await getHistoryPage(nextCursor);
+            setHistory(prev => [...prev, ...page.items]);
+            setNextCursor(page.nextCursor);
+        } catch (e) {
+            console.error("Failed to load more history", e);
+        }
+    };
+
     const handleExport = async () => {
         try {
             const response = await exportCsv();
@@ -65,7 +107,8 @@ export default function History() {
                         <tr>
                             <th className="px-6 py-4">Date</th>
                             <th className="px-6 py-4">Time Window</th>
-                            <th className="px-6 py-4">Total Count</th>
+                            <th className="px-6 py-4">Schedule</th>
+                            <th className="px-6 py-4">Schedule Count</th>
                             <th className="px-6 py-4">Status</th>
                         </tr>
                     </thead>
@@ -80,6 +123,9 @@ export default function History() {
                                     {' - '}
                                     {item.end_time ? new Date(item.end_time).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' }) : '...'}
                                 </td>
+                                <td className="px-6 py-4 text-slate-400">
+                                    {item.schedule_name}
+                                </td>
                                 <td className="px-6 py-4 font-bold text-indigo-400">
                                     {Math.round(item.total_hall_count)}
                                 </td>
@@ -102,7 +148,7 @@ export default function History() {
                         ))}
                         {history.length === 0 && (
                             <tr>
-                                <td colSpan={4} className="px-6 py-12 text-center text-slate-500">
+                                <td colSpan={5} className="px-6 py-12 text-center text-slate-500">
                                     No records found.
                                 </td>
                             </tr>
@@ -110,6 +156,17 @@ export default function History() {
                     </tbody>
                 </table>
             </div>
+
+            {nextCursor !== null && (
+                <div className="mt-4 flex justify-center">
+                    <button
+                        onClick={loadMore}
+                        className="px-4 py-2 bg-slate-800 hover:bg-slate-700 border border-white/10 rounded-lg text-sm transition-colors"
+                    >
+                        Load more
+                    </button>
+                </div>
+            )}
         </div>
     );
 }
@@ -1,7 +1,9 @@
 import axios from 'axios';
 
+const API_BASE = 'http://localhost:8000';
+
 const api = axios.create({
-    baseURL: 'http://localhost:8000',
+    baseURL: API_BASE,
     headers: {
         'Content-Type': 'application/json',
     },
@@ -31,6 +33,14 @@ export const createZone = async (data: any) => (await api.post<Zone>('/zones', d
 export const deleteZone = async (id: number) => (await api.delete(`/zones/${id}`)).data;
 
 export const getHistory = async () => (await api.get('/stats/history')).data;
+export const getHistoryPage = async (cursor?: number) => {
+    const res = await api.get('/stats/history', { params: cursor ? { cursor } : {} });
+    const next = res.headers['x-next-cursor'];
+    return { items: res.data, nextCursor: next ? Number(next) : null };
+};
 export const exportCsv = async () => (await api.get('/stats/export', { responseType: 'blob' }));
 
+// Server push: "snapshot", "capture", "session" and "status" events (see backend /stats/stream)
+export const openStatsStream = () => new EventSource(`${API_BASE}/stats/stream`);
+
 export default api;